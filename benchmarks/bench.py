@@ -0,0 +1,336 @@
+"""Headless benchmarks for the hot paths of the game.
+
+Every scenario is seeded, so runs on different commits time the same work:
+
+    python benchmarks/bench.py --output before.json
+    python benchmarks/bench.py --output after.json
+    python benchmarks/bench.py --compare before.json after.json
+
+Pass scenario name prefixes to run only some of them, e.g.
+``python benchmarks/bench.py collision particles``.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+import pygame
+from loftwahnoid.constants import WIDTH, HEIGHT, RED
+from loftwahnoid.autopilot import Autopilot
+from loftwahnoid.simulation import GameState, Inputs, step, generate_level, generate_mega_level
+from loftwahnoid.bricks import BrickStore, NORMAL, COLORS
+from loftwahnoid.particles import ParticleSystem
+from loftwahnoid.render import Renderer
+from loftwahnoid.sprites.paddle import Paddle
+from loftwahnoid.sprites.powerup import PowerUp
+
+SEED = 1234
+# Each scenario is timed in REPEATS batches of at least MIN_BATCH seconds
+REPEATS = 5
+MIN_BATCH = 0.05
+# Playfield of the mega board scenarios, a large-format cabinet display
+MEGA_SIZE = (1920, 1080)
+# A scenario counts as changed when its median moves by more than this
+DEFAULT_THRESHOLD = 0.10
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register a setup function. It returns a callable that does one unit of work."""
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+def tracking_inputs(state):
+    # Follows the ball closely enough to keep most games going
+    center = state.paddle.rect.centerx
+    x = state.ball.x
+    return Inputs(left=x < center - 5, right=x > center + 5, fire=True, launch=True)
+
+
+def played_state(ticks=600, **kwargs):
+    """A game advanced ticks steps by the tracking paddle, for mid-game scenes."""
+    state = GameState(seed=SEED, **kwargs)
+    for _ in range(ticks):
+        step(state, tracking_inputs(state))
+    return state
+
+
+def brick_wall(n, rng):
+    """A BrickStore of n small bricks in rows across the screen, for collision scenarios."""
+    cols = 100
+    width = WIDTH / cols
+    height = max(2, (HEIGHT // 2) // max(1, n // cols))
+    rects = [(int((i % cols) * width), (i // cols) * height, int(width) - 1, height - 1) for i in range(n)]
+    return BrickStore(rects, [NORMAL] * n, [1] * n, [rng.randrange(len(COLORS)) for _ in range(n)])
+
+
+@scenario('level/generate')
+def _generate_level():
+    rng = random.Random(SEED)
+    return lambda: generate_level(10, rng)
+
+
+@scenario('level/load')
+def _load_level():
+    state = GameState(seed=SEED, effects=False)
+    return lambda: state.load_level(10)
+
+
+@scenario('level/generate_mega')
+def _generate_mega_level():
+    rng = random.Random(SEED)
+    return lambda: generate_mega_level(10, rng, width=MEGA_SIZE[0], height=MEGA_SIZE[1])
+
+
+def _collision(n):
+    def setup():
+        rng = random.Random(SEED)
+        bricks = brick_wall(n, rng)
+        rects = [pygame.Rect(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT // 2), 16, 16) for _ in range(1024)]
+        i = itertools.count()
+
+        def run():
+            bricks.first_hit(rects[next(i) & 1023])
+        return run
+    return setup
+
+
+for _n in (50, 1000, 10000):
+    scenario(f'collision/grid_first_hit/{_n}')(_collision(_n))
+
+
+def _particles(n, draw):
+    def setup():
+        rng = random.Random(SEED)
+        screen = pygame.display.get_surface()
+        particles = ParticleSystem()
+        colors = [RED, (255, 165, 0), (255, 255, 0), (0, 255, 255)]
+
+        # Long lives so refilling, which is timed too, is rare
+        def refill():
+            particles.clear()
+            for _ in range(n):
+                particles.emit(rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT), rng.randint(200, 400),
+                               rng.choice(colors), rng.uniform(-2, 2), rng.uniform(-2, 2))
+
+        refill()
+
+        def run():
+            if particles.count < n // 2:
+                refill()
+            if draw:
+                particles.draw(screen)
+            else:
+                particles.update()
+        return run
+    return setup
+
+
+for _n in (100, 1000, 10000):
+    scenario(f'particles/update/{_n}')(_particles(_n, False))
+    scenario(f'particles/draw/{_n}')(_particles(_n, True))
+
+
+@scenario('draw/brick')
+def _draw_brick():
+    screen = pygame.display.get_surface()
+    bricks = generate_level(10, random.Random(SEED))
+    i = itertools.count()
+    return lambda: bricks.draw_brick(screen, next(i) % len(bricks))
+
+
+@scenario('draw/paddle')
+def _draw_paddle():
+    screen = pygame.display.get_surface()
+    paddle = Paddle(WIDTH // 2 - 50, HEIGHT - 30, 100, 10, 7)
+    return lambda: paddle.draw(screen, 0.5)
+
+
+@scenario('draw/powerup')
+def _draw_powerup():
+    screen = pygame.display.get_surface()
+    kinds = [PowerUp.WIDE_PADDLE, PowerUp.STICKY_PADDLE, PowerUp.SHOOTING_PADDLE, PowerUp.EXTRA_LIFE,
+             PowerUp.MULTI_BALL]
+    power_ups = [PowerUp(100 + 120 * i, 300, kind) for i, kind in enumerate(kinds)]
+    i = itertools.count()
+    return lambda: power_ups[next(i) % len(power_ups)].draw(screen, 0.5)
+
+
+def _frame(dirty_rects):
+    def setup():
+        screen = pygame.display.get_surface()
+        state = played_state()
+        renderer = Renderer(screen, dirty_rects)
+
+        def run():
+            renderer.draw(state, 0.5)
+            renderer.present()
+        return run
+    return setup
+
+
+scenario('frame/full')(_frame(False))
+scenario('frame/dirty_rects')(_frame(True))
+
+
+def _steps(**kwargs):
+    def setup():
+        state = played_state(0, **kwargs)
+
+        def run():
+            nonlocal state
+            if state.game_over:
+                state = GameState(seed=SEED, **kwargs)
+            step(state, tracking_inputs(state))
+        return run
+    return setup
+
+
+scenario('sim/step')(_steps(effects=False))
+scenario('sim/step_effects')(_steps(effects=True))
+scenario('sim/step_swept')(_steps(effects=False, swept_collision=True))
+scenario('sim/step_mega')(_steps(effects=False, mega=True, size=MEGA_SIZE))
+scenario('sim/step_mega_swept')(_steps(effects=False, mega=True, size=MEGA_SIZE, swept_collision=True))
+
+
+def _autopilot(**kwargs):
+    def setup():
+        state = GameState(seed=SEED, effects=False, **kwargs)
+        pilot = Autopilot()
+
+        def run():
+            # A tick of an autopilot game, inputs and step together
+            nonlocal state, pilot
+            if state.game_over:
+                state = GameState(seed=SEED, effects=False, **kwargs)
+                pilot = Autopilot()
+            step(state, pilot.inputs(state))
+        return run
+    return setup
+
+
+scenario('autopilot/step')(_autopilot())
+scenario('autopilot/step_mega')(_autopilot(mega=True, size=MEGA_SIZE))
+
+
+def time_scenario(setup, repeats=REPEATS, min_batch=MIN_BATCH):
+    """Return per-call seconds for each of repeats batches."""
+    run = setup()
+    # Grow the batch until it is long enough to time reliably
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_batch:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_batch / elapsed) + 1))
+    times = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        times.append((time.perf_counter() - start) / number)
+    return times, number
+
+
+def run_benchmarks(prefixes=(), repeats=REPEATS):
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {}
+    for name, setup in SCENARIOS.items():
+        if prefixes and not any(name.startswith(p) for p in prefixes):
+            continue
+        times, number = time_scenario(setup, repeats)
+        results[name] = {
+            'median_us': statistics.median(times) * 1e6,
+            'min_us': min(times) * 1e6,
+            'ops_per_sec': 1 / statistics.median(times),
+            'calls': number,
+        }
+        print(f"{name:<32}{results[name]['median_us']:>12.2f} us{results[name]['ops_per_sec']:>14.0f} /s")
+    pygame.quit()
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': SEED,
+        },
+        'results': results,
+    }
+
+
+def compare(base, new, threshold=DEFAULT_THRESHOLD):
+    """Print every scenario's change between two result files and return the regressed names."""
+    regressions = []
+    print(f"{'scenario':<32}{'base us':>12}{'new us':>12}{'change':>9}")
+    for name, result in new['results'].items():
+        old = base['results'].get(name)
+        if old is None:
+            print(f"{name:<32}{'-':>12}{result['median_us']:>12.2f}      new")
+            continue
+        change = result['median_us'] / old['median_us'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{name:<32}{old['median_us']:>12.2f}{result['median_us']:>12.2f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('scenarios', nargs='*', help="Only run scenarios starting with these prefixes")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Compare two result files")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression (default 0.10)")
+    parser.add_argument('--list', action='store_true', help="List the scenarios and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(SCENARIOS))
+        return 0
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        regressions = compare(base, new, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+        return 0
+
+    results = run_benchmarks(args.scenarios, args.repeats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
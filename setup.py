@@ -5,9 +5,11 @@ setup(
     version="0.1.0",
     packages=find_packages(where="src"),
     package_dir={"": "src"},
+    package_data={"loftwahnoid": ["packs/*.json"]},
     install_requires=[
         "pygame>=2.6.1",
         "pygame-menu>=4.5.1",
+        "numpy",
     ],
     python_requires=">=3.8",
     entry_points={
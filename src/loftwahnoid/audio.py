@@ -0,0 +1,126 @@
+import os
+import pygame
+
+SOUND_DIR = os.path.join(os.path.dirname(__file__), 'sounds')
+MUSIC_FILE = 'music.wav'
+
+# Sound effects and the category whose channels they play on
+SOUNDS = {
+    'ding': 'hit',
+    'death': 'player',
+    'life': 'player',
+    'powerup': 'pickup',
+}
+
+# Channels reserved per category, a full category cuts off its oldest sound
+# instead of taking channels from the others
+CATEGORY_CHANNELS = {
+    'hit': 4,
+    'player': 2,
+    'pickup': 2,
+}
+
+
+class AudioManager:
+    """Loads the sound effects once and plays them on reserved channels.
+
+    play() only marks a sound for the current frame and flush() starts each
+    marked sound once, so a salvo of bullets breaking bricks on the same
+    frame plays a single ding. Music is streamed from disk by
+    pygame.mixer.music rather than decoded into memory.
+    """
+
+    def __init__(self, sound_dir=SOUND_DIR):
+        self.sound_dir = sound_dir
+        self.sounds = {}
+        self.channels = {}
+        self._next = {}
+        self._pending = []
+        self._music = None
+        self._music_loaded = False
+        self.enabled = self._init_mixer()
+        if not self.enabled:
+            return
+
+        total = sum(CATEGORY_CHANNELS.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), total))
+        # Keep the reserved channels away from anything calling Sound.play()
+        pygame.mixer.set_reserved(total)
+        first = 0
+        for category, count in CATEGORY_CHANNELS.items():
+            self.channels[category] = [pygame.mixer.Channel(i) for i in range(first, first + count)]
+            self._next[category] = 0
+            first += count
+
+        missing = []
+        for name in SOUNDS:
+            try:
+                self.sounds[name] = pygame.mixer.Sound(os.path.join(sound_dir, f'{name}.wav'))
+            except (pygame.error, FileNotFoundError):
+                missing.append(name)
+        music = os.path.join(sound_dir, MUSIC_FILE)
+        if os.path.exists(music):
+            self._music = music
+        else:
+            missing.append('music')
+        if missing:
+            print(f"Warning: Some sound files could not be loaded: {', '.join(missing)}")
+
+    def _init_mixer(self):
+        if pygame.mixer.get_init():
+            return True
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            print(f"Warning: No audio, {e}")
+            return False
+        return True
+
+    def play(self, name):
+        """Queue a sound effect for this frame, repeats are dropped."""
+        if name in self.sounds and name not in self._pending:
+            self._pending.append(name)
+
+    def flush(self):
+        """Start the sounds queued since the last flush, call once per frame."""
+        for name in self._pending:
+            channels = self.channels[SOUNDS[name]]
+            channel = next((c for c in channels if not c.get_busy()), None)
+            if channel is None:
+                # Everything busy, cut off the channels in turn
+                i = self._next[SOUNDS[name]]
+                channel = channels[i]
+                self._next[SOUNDS[name]] = (i + 1) % len(channels)
+            channel.play(self.sounds[name])
+        self._pending.clear()
+
+    def play_music(self):
+        """Start the music from the beginning."""
+        if not self._music:
+            return
+        try:
+            if not self._music_loaded:
+                pygame.mixer.music.load(self._music)
+                self._music_loaded = True
+            pygame.mixer.music.play()
+        except pygame.error as e:
+            print(f"Warning: could not play music: {e}")
+            self._music = None
+
+    def stop(self):
+        if self.enabled:
+            pygame.mixer.music.stop()
+            for channels in self.channels.values():
+                for channel in channels:
+                    channel.stop()
+
+
+_audio = None
+
+
+def get_audio():
+    """The process wide AudioManager, sounds are loaded on the first call."""
+    global _audio
+    if _audio is None:
+        _audio = AudioManager()
+    return _audio
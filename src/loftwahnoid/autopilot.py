@@ -0,0 +1,174 @@
+import numpy as np
+from .simulation import Inputs
+
+
+def fold(x, low, high):
+    """Where a ball moving freely to x ends up after bouncing between walls at low and high."""
+    span = high - low
+    if span <= 0:
+        return low
+    u = (x - low) % (2 * span)
+    return low + (u if u <= span else 2 * span - u)
+
+
+def _ceiling(state, ticks):
+    """Ticks until the rising main ball first touches a live brick, or None if it reaches the top wall first."""
+    ball = state.ball
+    bricks = state.bricks
+    if not bricks:
+        return None
+    r = ball.radius
+    vel_x, vel_y = ball.vel_x, -ball.vel_y
+    bottom = bricks.bounds[3]
+    # Skip straight to the lowest row, then march up a radius at a time,
+    # which is less than the ball's own height so no row is stepped over
+    t = max((ball.y - r - bottom) / vel_y, 0)
+    dt = r / vel_y
+    high = state.width - r
+    while t < ticks:
+        x = fold(ball.x + vel_x * t, r, high)
+        y = ball.y - vel_y * t
+        if bricks.first_hit_box(x - r, y - r, x + r, y + r) >= 0:
+            return t
+        t += dt
+    return None
+
+
+def predict_landing(state):
+    """The x where the main ball will next reach the paddle's height, and the ticks until it does.
+
+    Walls are reflected analytically and a rising ball bounces off the
+    first live brick in its way, or the top wall. Bricks on the way down
+    are ignored, so the prediction is redone every tick and corrects itself
+    after each hit. Returns None if the ball is not moving.
+    """
+    ball = state.ball
+    vel_x, vel_y = ball.vel_x, ball.vel_y
+    if not ball.started or vel_y == 0:
+        return None
+    r = ball.radius
+    land_y = state.paddle.rect.top - r
+    if vel_y > 0:
+        ticks = max(land_y - ball.y, 0) / vel_y
+    else:
+        up = (ball.y - r) / -vel_y
+        ceiling = _ceiling(state, up)
+        if ceiling is not None:
+            up = ceiling
+        # Up to the ceiling and back down from there
+        ticks = up + max(land_y - (ball.y + vel_y * up), 0) / -vel_y
+    return fold(ball.x + vel_x * ticks, r, state.width - r), ticks
+
+
+class Autopilot:
+    """Plays the game, producing the Inputs a player's keys would.
+
+    Every tick it predicts where the ball will come down and moves the
+    paddle under it. Where the ball leaves the paddle decides its new angle
+    (the same rule the simulation uses), so while the ball is falling the
+    autopilot shifts the paddle to send it at a target: the lowest standing
+    brick, the one nearest the landing point on ties. While the ball is on
+    its way up it goes after falling power-ups if it has time. Targets are
+    picked once per fall and the landing once per trajectory, so most ticks
+    cost next to nothing.
+
+    Inputs only depend on the state, so games it plays replay exactly.
+    Plug it in wherever a player's Inputs would go:
+
+        autopilot = Autopilot()
+        step(state, autopilot.inputs(state))
+    """
+
+    def __init__(self, aim=True, catch_power_ups=True):
+        self.aim = aim
+        self.catch_power_ups = catch_power_ups
+        self._falling = False
+        self._target = None
+        self._prediction = None
+        self._trajectory = None
+
+    def _predict(self, state):
+        # The ball flies straight until its velocity changes, so the landing
+        # only has to be worked out again after a bounce or a broken brick
+        ball = state.ball
+        trajectory = (ball.vel_x, ball.vel_y, len(state.bricks), state.paddle.rect.top)
+        if trajectory != self._trajectory:
+            self._trajectory = trajectory
+            prediction = predict_landing(state)
+            self._prediction = prediction and (prediction[0], state.tick + prediction[1])
+        if self._prediction is None:
+            return None
+        land_x, land_tick = self._prediction
+        return land_x, max(land_tick - state.tick, 0)
+
+    def _pick_target(self, state, land_x):
+        bricks = state.bricks
+        if not bricks:
+            return None
+        live = bricks.alive
+        boxes = bricks.boxes
+        bottoms = np.where(live, boxes[:, 3], -1)
+        lowest = np.flatnonzero(bottoms == bottoms.max())
+        centers = (boxes[lowest, 0] + boxes[lowest, 2]) / 2
+        best = int(np.argmin(np.abs(centers - land_x)))
+        return float(centers[best]), int(boxes[lowest[best], 3])
+
+    def _aim_offset(self, state, land_x):
+        # Offset from the paddle centre, in half widths, that sends the ball at the target
+        target_x, target_y = self._target
+        ball = state.ball
+        r = ball.radius
+        rise = (state.paddle.rect.top - r) - (target_y + r)
+        if rise <= 0:
+            return 0.0
+        # The bounce keeps the vertical speed and sets the sideways one from the offset
+        ticks = rise / abs(ball.vel_y)
+        # The target and its mirror images in the side walls, take the one needing the least sideways speed
+        span = state.width - 2 * r
+        u = target_x - r
+        best = None
+        for k in (-1, 0, 1):
+            for image in (2 * k * span + u, 2 * k * span - u):
+                vel_x = (r + image - land_x) / ticks
+                if best is None or abs(vel_x) < abs(best):
+                    best = vel_x
+        return max(-0.9, min(0.9, best / ball.speed))
+
+    def _target_x(self, state):
+        paddle = state.paddle
+        ball = state.ball
+        if not ball.started or ball.stuck_to_paddle:
+            return None
+        prediction = self._predict(state)
+        if prediction is None:
+            return None
+        land_x, ticks = prediction
+        falling = ball.vel_y > 0
+        if falling and not self._falling:
+            self._target = self._pick_target(state, land_x) if self.aim else None
+        self._falling = falling
+
+        if not falling and self.catch_power_ups and state.power_ups:
+            # Power-ups fall at a fixed speed, go for the lowest one we can reach before the ball lands
+            power_up = max(state.power_ups, key=lambda p: p.y)
+            drop_ticks = (paddle.rect.top - power_up.y) / power_up.speed
+            travel = abs(power_up.x - paddle.rect.centerx) + abs(land_x - power_up.x)
+            if 0 < drop_ticks < ticks and travel / paddle.speed < ticks:
+                return power_up.x
+
+        offset = 0.0
+        if self._target is not None and falling:
+            offset = self._aim_offset(state, land_x)
+        return land_x - offset * paddle.rect.width / 2
+
+    def inputs(self, state):
+        """The Inputs for the next step of state."""
+        paddle = state.paddle
+        target = self._target_x(state)
+        left = right = False
+        if target is not None:
+            # Stop within one move of the target instead of jittering around it
+            center = paddle.rect.centerx
+            left = target < center - paddle.speed / 2
+            right = target > center + paddle.speed / 2
+        return Inputs(left=left, right=right, fire=paddle.shooting, launch=True)
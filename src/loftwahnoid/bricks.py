@@ -0,0 +1,182 @@
+import numpy as np
+import pygame
+from .sprites.brick import NORMAL, TOUGH, COLORS, brick_color, brick_sprite
+
+# Grid cells are never smaller than this, so tiny bricks still share cells
+MIN_CELL = 8
+
+
+def _cell_size(extent):
+    # Smallest power of two at least as big as the largest brick
+    size = MIN_CELL
+    while size < extent:
+        size *= 2
+    return size
+
+
+class BrickStore:
+    """Every brick of a level, stored as parallel NumPy arrays.
+
+    A brick is just an index: rects holds its x, y, width and height, types
+    its NORMAL/TOUGH type, hits_required and hits how tough it is and
+    how often it was hit, colors an index into COLORS and alive whether
+    it is still standing. Breaking a brick only clears its alive flag, so it
+    costs the same with ten bricks or ten thousand, and len() counts the
+    bricks still standing.
+
+    Lookups go through a uniform grid with cells about the size of a brick.
+    Each cell lists the bricks overlapping it in index order, so a query
+    only visits the few cells under the query box and the first hit is the
+    lowest index, the same brick a scan of the whole level would find.
+    Broken bricks stay in their cells and are skipped.
+    """
+
+    def __init__(self, rects, types, hits_required, colors):
+        self.rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+        n = len(self.rects)
+        self.types = np.asarray(types, dtype=np.uint8)
+        self.hits_required = np.asarray(hits_required, dtype=np.uint8)
+        self.hits = np.zeros(n, dtype=np.uint8)
+        self.colors = np.asarray(colors, dtype=np.uint8)
+        # Left, top, right, bottom edges, for whole-array tests
+        self.boxes = np.empty((n, 4), dtype=np.int32)
+        self.boxes[:, :2] = self.rects[:, :2]
+        self.boxes[:, 2:] = self.rects[:, :2] + self.rects[:, 2:]
+        # The mask is a view of a bytearray so single flags can be read and
+        # cleared without going through NumPy scalars
+        self._alive = bytearray(b'\x01') * n
+        self.alive = np.frombuffer(self._alive, dtype=bool) if n else np.zeros(0, dtype=bool)
+        self._count = n
+        self._box_list = [tuple(box) for box in self.boxes.tolist()]
+        self._build_grid()
+
+    def __len__(self):
+        return self._count
+
+    def _build_grid(self):
+        if not self._count:
+            self.bounds = (0, 0, 0, 0)
+            self._cells = []
+            self._grid = (MIN_CELL, MIN_CELL, 0, 0, 0, 0)
+            return
+        left, top = self.boxes[:, :2].min(axis=0).tolist()
+        right, bottom = self.boxes[:, 2:].max(axis=0).tolist()
+        self.bounds = (left, top, right, bottom)
+        cell_w = _cell_size(int(self.rects[:, 2].max()))
+        cell_h = _cell_size(int(self.rects[:, 3].max()))
+        cols = (right - left - 1) // cell_w + 1
+        rows = (bottom - top - 1) // cell_h + 1
+        self._grid = (cell_w, cell_h, cols, rows, left, top)
+        # Pair every brick with each cell it overlaps (usually one to four),
+        # then group the pairs by cell keeping the bricks in index order
+        x0 = (self.boxes[:, 0] - left) // cell_w
+        x1 = (self.boxes[:, 2] - 1 - left) // cell_w
+        y0 = (self.boxes[:, 1] - top) // cell_h
+        y1 = (self.boxes[:, 3] - 1 - top) // cell_h
+        index = np.arange(len(self.boxes))
+        cell_ids = []
+        bricks = []
+        for dy in range(int((y1 - y0).max()) + 1):
+            for dx in range(int((x1 - x0).max()) + 1):
+                inside = (x0 + dx <= x1) & (y0 + dy <= y1)
+                cell_ids.append(((y0 + dy) * cols + x0 + dx)[inside])
+                bricks.append(index[inside])
+        cell_ids = np.concatenate(cell_ids)
+        bricks = np.concatenate(bricks)
+        order = np.lexsort((bricks, cell_ids))
+        bounds = np.searchsorted(cell_ids[order], np.arange(cols * rows + 1)).tolist()
+        bricks = bricks[order].tolist()
+        cells = [bricks[start:end] for start, end in zip(bounds, bounds[1:])]
+        self._cells = cells
+
+    def _cells_under(self, left, top, right, bottom):
+        # Every cell the box touches, edges included, clamped to the grid
+        cell_w, cell_h, cols, rows, x, y = self._grid
+        x0 = max(0, int((left - x) // cell_w))
+        x1 = min(cols - 1, int((right - x) // cell_w))
+        y0 = max(0, int((top - y) // cell_h))
+        y1 = min(rows - 1, int((bottom - y) // cell_h))
+        cells = self._cells
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                yield cells[cy * cols + cx]
+
+    def first_hit_box(self, left, top, right, bottom):
+        """Index of the first live brick overlapping the box, or -1."""
+        best = -1
+        alive = self._alive
+        boxes = self._box_list
+        for cell in self._cells_under(left, top, right, bottom):
+            for i in cell:
+                if best != -1 and i >= best:
+                    break
+                if alive[i]:
+                    l, t, r, b = boxes[i]
+                    if left < r and right > l and top < b and bottom > t:
+                        best = i
+                        break
+        return best
+
+    def first_hit(self, rect):
+        """Index of the first live brick colliding with a pygame Rect, or -1."""
+        if not rect.width or not rect.height:
+            return -1
+        return self.first_hit_box(rect.left, rect.top, rect.right, rect.bottom)
+
+    def candidates(self, rect):
+        """Sorted indices of the live bricks sharing a grid cell with rect."""
+        found = set()
+        alive = self._alive
+        for cell in self._cells_under(rect.left, rect.top, rect.right, rect.bottom):
+            found.update(i for i in cell if alive[i])
+        return sorted(found)
+
+    def box(self, i):
+        """The left, top, right and bottom edges of brick i."""
+        return self._box_list[i]
+
+    def rect(self, i):
+        left, top, right, bottom = self._box_list[i]
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def center(self, i):
+        left, top, right, bottom = self._box_list[i]
+        # Rounded like pygame.Rect.center
+        return left + (right - left) // 2, top + (bottom - top) // 2
+
+    def is_alive(self, i):
+        return bool(self._alive[i])
+
+    def hit(self, i):
+        """Hit brick i and return True if that broke it."""
+        self.hits[i] += 1
+        if self.hits[i] < self.hits_required[i]:
+            return False
+        self._alive[i] = 0
+        self._count -= 1
+        return True
+
+    def set_hits(self, indices, hits):
+        """Overwrite the hit counts of some bricks, breaking those that reach their limit."""
+        self.hits[indices] = hits
+        self.alive[indices] = self.hits[indices] < self.hits_required[indices]
+        self._count = int(np.count_nonzero(self.alive))
+
+    def _sprite(self, brick_type, hits, color, width, height):
+        return brick_sprite(brick_color(brick_type, hits, COLORS[color]), (width, height), brick_type, hits)
+
+    def draw(self, surface):
+        """Draw every live brick onto surface."""
+        live = np.flatnonzero(self.alive)
+        sprite = self._sprite
+        surface.blits([(sprite(brick_type, hits, color, w, h), (x, y))
+                       for (x, y, w, h), brick_type, hits, color in zip(self.rects[live].tolist(),
+                                                                         self.types[live].tolist(),
+                                                                         self.hits[live].tolist(),
+                                                                         self.colors[live].tolist())],
+                      doreturn=False)
+
+    def draw_brick(self, surface, i):
+        left, top, right, bottom = self._box_list[i]
+        sprite = self._sprite(self.types.item(i), self.hits.item(i), self.colors.item(i), right - left, bottom - top)
+        surface.blit(sprite, (left, top))
@@ -0,0 +1,104 @@
+import math
+
+
+def _ray_box(x, y, dx, dy, left, top, right, bottom):
+    # Slab test for a ray against an axis-aligned box, returning (t, nx, ny)
+    if dx == 0:
+        if x < left or x > right:
+            return None
+        tx0, tx1 = -math.inf, math.inf
+    else:
+        tx0 = (left - x) / dx
+        tx1 = (right - x) / dx
+        if tx0 > tx1:
+            tx0, tx1 = tx1, tx0
+    if dy == 0:
+        if y < top or y > bottom:
+            return None
+        ty0, ty1 = -math.inf, math.inf
+    else:
+        ty0 = (top - y) / dy
+        ty1 = (bottom - y) / dy
+        if ty0 > ty1:
+            ty0, ty1 = ty1, ty0
+
+    t_enter = max(tx0, ty0)
+    t_exit = min(tx1, ty1)
+    # Starting inside (t_enter < 0) is not an impact, the ball is leaving
+    if t_enter > t_exit or t_enter < 0 or t_enter > 1:
+        return None
+    if tx0 > ty0:
+        return t_enter, (-1 if dx > 0 else 1), 0
+    return t_enter, 0, (-1 if dy > 0 else 1)
+
+
+def _ray_circle(x, y, dx, dy, cx, cy, radius):
+    ox = x - cx
+    oy = y - cy
+    c = ox * ox + oy * oy - radius * radius
+    if c < 0:
+        return None
+    a = dx * dx + dy * dy
+    if a == 0:
+        return None
+    b = 2 * (ox * dx + oy * dy)
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / (2 * a)
+    if t < 0 or t > 1:
+        return None
+    return t, (ox + dx * t) / radius, (oy + dy * t) / radius
+
+
+def sweep_circle_rect(x, y, dx, dy, radius, rect):
+    """Sweep a circle at (x, y) along (dx, dy) against rect.
+
+    Returns (t, nx, ny) for the first contact, where t is the fraction of the
+    move completed at impact and (nx, ny) is the unit surface normal, or None
+    if the circle does not hit rect during this move.
+    """
+    return sweep_circle_box(x, y, dx, dy, radius, rect.left, rect.top, rect.right, rect.bottom)
+
+
+def sweep_circle_box(x, y, dx, dy, radius, left, top, right, bottom):
+    """sweep_circle_rect against a box given by its edges."""
+    # The rect grown by the radius is two boxes plus four rounded corners
+    shapes = (
+        _ray_box(x, y, dx, dy, left - radius, top, right + radius, bottom),
+        _ray_box(x, y, dx, dy, left, top - radius, right, bottom + radius),
+        _ray_circle(x, y, dx, dy, left, top, radius),
+        _ray_circle(x, y, dx, dy, right, top, radius),
+        _ray_circle(x, y, dx, dy, left, bottom, radius),
+        _ray_circle(x, y, dx, dy, right, bottom, radius),
+    )
+    best = None
+    for hit in shapes:
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = hit
+    return best
+
+
+def sweep_circle_walls(x, y, dx, dy, radius, width):
+    """Sweep a circle against the left, right and top walls of the playfield.
+
+    A circle already past a wall and still moving outwards hits it at t=0.
+    """
+    best = None
+    if dx < 0:
+        best = (max(0, (radius - x) / dx), 1, 0)
+    elif dx > 0:
+        best = (max(0, (width - radius - x) / dx), -1, 0)
+    if dy < 0:
+        t = max(0, (radius - y) / dy)
+        if best is None or t < best[0]:
+            best = (t, 0, 1)
+    if best is None or best[0] > 1:
+        return None
+    return best
+
+
+def reflect(vel_x, vel_y, nx, ny):
+    """Reflect a velocity about a unit surface normal."""
+    dot = vel_x * nx + vel_y * ny
+    return vel_x - 2 * dot * nx, vel_y - 2 * dot * ny
@@ -1,6 +1,24 @@
+import os
+
+
+def _playfield_size(value, default=(800, 600)):
+    # "WIDTH x HEIGHT" in pixels, e.g. LOFTWAHNOID_SIZE=1920x1080
+    if not value:
+        return default
+    try:
+        width, height = (int(n) for n in value.lower().split('x'))
+    except ValueError:
+        width = height = 0
+    if width < 320 or height < 240:
+        print(f"Warning: ignoring playfield size {value!r}, expected WIDTHxHEIGHT of at least 320x240")
+        return default
+    return width, height
+
+
 # Game constants
-WIDTH, HEIGHT = 800, 600
+WIDTH, HEIGHT = _playfield_size(os.environ.get('LOFTWAHNOID_SIZE'))
 FPS = 60
+TICK_RATE = 60  # Simulation steps per second, independent of the render rate
 
 # Colors
 BLACK = (0, 0, 0)
@@ -8,4 +26,4 @@ WHITE = (255, 255, 255)
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
-YELLOW = (255, 255, 0) 
\ No newline at end of file
+YELLOW = (255, 255, 0)
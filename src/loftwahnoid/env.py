@@ -0,0 +1,216 @@
+import multiprocessing
+import random
+import numpy as np
+from .simulation import GameState, Inputs, step
+
+# Discrete actions, FIRE both launches the ball and fires bullets
+NOOP, LEFT, RIGHT, FIRE, LEFT_FIRE, RIGHT_FIRE = range(6)
+ACTION_INPUTS = [
+    Inputs(),
+    Inputs(left=True),
+    Inputs(right=True),
+    Inputs(fire=True, launch=True),
+    Inputs(left=True, fire=True, launch=True),
+    Inputs(right=True, fire=True, launch=True),
+]
+NUM_ACTIONS = len(ACTION_INPUTS)
+
+# Length of the brick-alive bitmap, enough for the generated 5x10 levels
+BRICK_SLOTS = 50
+
+
+class PaddleEnv:
+    """Gym-style environment over the game rules, with no display.
+
+    reset() returns (observation, info) and step(action) returns
+    (observation, reward, terminated, truncated, info). The observation is a
+    dict of arrays: 'ball' is the main ball's x, y, vel_x, vel_y, 'paddle' is
+    the paddle's x and width and 'bricks' flags which bricks of the level are
+    still standing. The reward is the score gained during the step.
+    """
+
+    def __init__(self, seed=None, swept_collision=False, max_ticks=None, brick_slots=BRICK_SLOTS):
+        self.swept_collision = swept_collision
+        self.max_ticks = max_ticks
+        self.brick_slots = brick_slots
+        self._seeds = random.Random(seed)
+        self.state = None
+
+    def _observe(self, ball, paddle, bricks):
+        state = self.state
+        b = state.ball
+        ball[:] = (b.x, b.y, b.vel_x, b.vel_y)
+        paddle[:] = (state.paddle.rect.x, state.paddle.rect.width)
+        alive = state.bricks.alive[:self.brick_slots]
+        bricks[:len(alive)] = alive
+        bricks[len(alive):] = 0
+
+    def observation(self):
+        obs = {
+            'ball': np.zeros(4, dtype=np.float32),
+            'paddle': np.zeros(2, dtype=np.float32),
+            'bricks': np.zeros(self.brick_slots, dtype=np.uint8),
+        }
+        self._observe(obs['ball'], obs['paddle'], obs['bricks'])
+        return obs
+
+    def info(self):
+        state = self.state
+        return {'score': state.score, 'lives': state.lives, 'level': state.level, 'tick': state.tick}
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self._seeds.getrandbits(32)
+        self.state = GameState(swept_collision=self.swept_collision, effects=False, seed=seed)
+        return self.observation(), self.info()
+
+    def _step(self, action):
+        state = self.state
+        score = state.score
+        step(state, ACTION_INPUTS[action])
+        truncated = self.max_ticks is not None and state.tick >= self.max_ticks
+        return state.score - score, state.game_over, truncated
+
+    def step(self, action):
+        reward, terminated, truncated = self._step(action)
+        return self.observation(), reward, terminated, truncated, self.info()
+
+
+class _EnvBatch:
+    # A run of environments stepped in a loop, writing straight into batch arrays
+
+    def __init__(self, seeds, env_kwargs):
+        self.envs = [PaddleEnv(seed=seed, **env_kwargs) for seed in seeds]
+        n = len(self.envs)
+        slots = self.envs[0].brick_slots if self.envs else BRICK_SLOTS
+        self.ball = np.zeros((n, 4), dtype=np.float32)
+        self.paddle = np.zeros((n, 2), dtype=np.float32)
+        self.bricks = np.zeros((n, slots), dtype=np.uint8)
+        self.reward = np.zeros(n, dtype=np.int32)
+        self.terminated = np.zeros(n, dtype=bool)
+        self.truncated = np.zeros(n, dtype=bool)
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            env.reset()
+            env._observe(self.ball[i], self.paddle[i], self.bricks[i])
+        return self.ball, self.paddle, self.bricks
+
+    def step(self, actions):
+        for i, (env, action) in enumerate(zip(self.envs, actions.tolist())):
+            reward, terminated, truncated = env._step(action)
+            self.reward[i] = reward
+            self.terminated[i] = terminated
+            self.truncated[i] = truncated
+            # Finished games start over, the step's flags still report the ending
+            if terminated or truncated:
+                env.reset()
+            env._observe(self.ball[i], self.paddle[i], self.bricks[i])
+        return self.ball, self.paddle, self.bricks, self.reward, self.terminated, self.truncated
+
+
+def _worker(conn, seeds, env_kwargs):
+    batch = _EnvBatch(seeds, env_kwargs)
+    try:
+        while True:
+            command, actions = conn.recv()
+            if command == 'step':
+                conn.send(batch.step(actions))
+            elif command == 'reset':
+                conn.send(batch.reset())
+            else:
+                break
+    finally:
+        conn.close()
+
+
+class VectorEnv:
+    """Steps num_envs independent games at once.
+
+    Observations, rewards and flags come back as arrays with one row per
+    game, and games that end are reset automatically. The 'serial' backend
+    runs every game in this process, 'process' splits them across a pool of
+    worker processes (one per CPU by default) that step their share in
+    parallel.
+    """
+
+    def __init__(self, num_envs, seed=None, backend='serial', workers=None, **env_kwargs):
+        if backend not in ('serial', 'process'):
+            raise ValueError(f"Unknown backend {backend!r}")
+        self.num_envs = num_envs
+        self.backend = backend
+        seeds = random.Random(seed).sample(range(2 ** 32), num_envs)
+
+        self.ball = np.zeros((num_envs, 4), dtype=np.float32)
+        self.paddle = np.zeros((num_envs, 2), dtype=np.float32)
+        self.bricks = np.zeros((num_envs, env_kwargs.get('brick_slots', BRICK_SLOTS)), dtype=np.uint8)
+        self.reward = np.zeros(num_envs, dtype=np.int32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+
+        if backend == 'serial':
+            self._batch = _EnvBatch(seeds, env_kwargs)
+            return
+
+        workers = min(workers or multiprocessing.cpu_count(), num_envs)
+        bounds = np.linspace(0, num_envs, workers + 1).astype(int)
+        self._slices = [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+        self._conns = []
+        self._procs = []
+        for part in self._slices:
+            parent, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(target=_worker, args=(child, seeds[part], env_kwargs), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    def _observation(self):
+        return {'ball': self.ball, 'paddle': self.paddle, 'bricks': self.bricks}
+
+    def _gather(self, names):
+        for part, conn in zip(self._slices, self._conns):
+            for name, value in zip(names, conn.recv()):
+                getattr(self, name)[part] = value
+
+    def reset(self):
+        if self.backend == 'serial':
+            self.ball, self.paddle, self.bricks = self._batch.reset()
+        else:
+            for conn in self._conns:
+                conn.send(('reset', None))
+            self._gather(('ball', 'paddle', 'bricks'))
+        return self._observation()
+
+    def step(self, actions):
+        """Apply one action per game, returns (observation, reward, terminated, truncated)."""
+        actions = np.asarray(actions)
+        names = ('ball', 'paddle', 'bricks', 'reward', 'terminated', 'truncated')
+        if self.backend == 'serial':
+            for name, value in zip(names, self._batch.step(actions)):
+                setattr(self, name, value)
+        else:
+            for part, conn in zip(self._slices, self._conns):
+                conn.send(('step', actions[part]))
+            self._gather(names)
+        return self._observation(), self.reward, self.terminated, self.truncated
+
+    def close(self):
+        if self.backend != 'process':
+            return
+        for conn in self._conns:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for proc in self._procs:
+            proc.join(timeout=1)
+        self._conns = []
+        self._procs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
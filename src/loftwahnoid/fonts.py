@@ -0,0 +1,29 @@
+from collections import OrderedDict
+import pygame
+
+# Rendered text surfaces kept around before the least recently used is dropped
+TEXT_CACHE_SIZE = 256
+
+_fonts = {}
+_text_cache = OrderedDict()
+
+
+def get_font(size):
+    """Return the default font at size, looked up only once per size."""
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.SysFont(None, size)
+    return font
+
+
+def render_text(text, size, color):
+    """Render text with the default font, reusing the surface while it is unchanged."""
+    key = (text, size, color)
+    surface = _text_cache.get(key)
+    if surface is not None:
+        _text_cache.move_to_end(key)
+        return surface
+    surface = _text_cache[key] = get_font(size).render(text, True, color)
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return surface
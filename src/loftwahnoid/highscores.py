@@ -1,28 +1,334 @@
+import bisect
 import json
+import atexit
 import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
 
-class HighScoreManager:
-    def __init__(self):
-        self.scores_file = os.path.join(os.path.dirname(__file__), '../../highscores.json')
-        self.high_scores = self._load_scores()
+# Number of entries shown on the leaderboard
+TOP_SCORES = 10
+
+
+def data_dir():
+    """Directory for per-user game data, LOFTWAHNOID_DATA_DIR overrides it."""
+    override = os.environ.get('LOFTWAHNOID_DATA_DIR')
+    if override:
+        return override
+    if os.name == 'nt':
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'loftwahnoid')
+
+
+def default_scores_path():
+    return os.environ.get('LOFTWAHNOID_HIGHSCORES') or os.path.join(data_dir(), 'highscores.json')
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def clean_entries(data):
+    """The well-formed score entries of decoded JSON, or None if it is not a list.
+
+    Entries need a name and integer score and level, anything else is dropped.
+    """
+    if not isinstance(data, list):
+        return None
+    return [{"name": str(e['name']), "score": e['score'], "level": e['level'], "time": e.get('time', 0)}
+            for e in data
+            if isinstance(e, dict) and 'name' in e and _is_int(e.get('score')) and _is_int(e.get('level'))]
+
+
+# Where scores were kept before they moved to data_dir(), next to the source tree
+LEGACY_SCORES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'highscores.json')
+
+
+def import_legacy_scores(store, path=None):
+    """Copy the scores of an old highscores.json into an empty store.
+
+    Only an empty store takes them, so they are imported once and the old
+    file is left alone. Returns how many entries were imported.
+    """
+    if store.top(1):
+        return 0
+    try:
+        with open(path or LEGACY_SCORES_PATH, 'r') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    entries = clean_entries(entries)
+    if entries:
+        store.add(entries)
+    return len(entries)
 
-    def _load_scores(self):
+
+class JSONScoreStore:
+    """Every score in one JSON list, kept sorted by score.
+
+    Writes go to a temporary file in the same directory which then replaces
+    the real one, so a crash mid-write leaves the previous file intact. A
+    file that can't be read as a score list is moved aside to <path>.bad
+    rather than overwritten, and the store starts from what could be kept.
+    Like SQLiteScoreStore it is shared by the caller's thread and the
+    writer, so reads and writes hold a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._damaged = False
+        self.entries = self._load()
+        # Negated scores, ascending, to bisect for ranks
+        self._keys = [-entry['score'] for entry in self.entries]
+        if self._damaged and self.entries:
+            # Write back what was kept, the damaged file is in the backup
+            self._save()
+
+    def _load(self):
         try:
-            with open(self.scores_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
             return []
+        except ValueError:
+            data = None
+        entries = clean_entries(data)
+        if entries is None or len(entries) != len(data):
+            self._keep_bad_file()
+        entries = entries or []
+        entries.sort(key=lambda x: x["score"], reverse=True)
+        return entries
+
+    def _keep_bad_file(self):
+        self._damaged = True
+        backup = self.path + '.bad'
+        print(f"Warning: {self.path} is damaged, keeping a copy in {backup}")
+        try:
+            os.replace(self.path, backup)
+        except OSError as e:
+            print(f"Warning: could not back up high scores: {e}")
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.highscores-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.entries, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def add(self, entries):
+        with self._lock:
+            for entry in entries:
+                # After any equal scores, like a stable sort would put it
+                i = bisect.bisect_right(self._keys, -entry['score'])
+                self._keys.insert(i, -entry['score'])
+                self.entries.insert(i, entry)
+            self._save()
+
+    def top(self, n):
+        with self._lock:
+            return self.entries[:n]
+
+    def rank(self, score):
+        with self._lock:
+            return bisect.bisect_left(self._keys, -score) + 1
+
+    def history(self, name):
+        with self._lock:
+            entries = [e for e in self.entries if e['name'] == name]
+        return sorted(entries, key=lambda e: e.get('time', 0))
+
+    def close(self):
+        pass
+
 
-    def _save_scores(self):
-        with open(self.scores_file, 'w') as f:
-            json.dump(self.high_scores, f)
+class SQLiteScoreStore:
+    """Scores in an SQLite table indexed on score and player name.
+
+    Leaderboard and rank queries read only the rows they need, so the table
+    can grow to any number of entries. The connection is shared by the
+    caller's thread and HighScoreManager's writer, so every use holds a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript('''
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS scores (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                level INTEGER NOT NULL,
+                time REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC);
+            CREATE INDEX IF NOT EXISTS scores_by_name ON scores (name, time);
+        ''')
+
+    def add(self, entries):
+        with self._lock, self.db:
+            self.db.executemany(
+                'INSERT INTO scores (name, score, level, time) VALUES (?, ?, ?, ?)',
+                [(e['name'], e['score'], e['level'], e.get('time', time.time())) for e in entries])
+
+    def _entries(self, rows):
+        return [{"name": name, "score": score, "level": level, "time": t} for name, score, level, t in rows]
+
+    def top(self, n):
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT name, score, level, time FROM scores ORDER BY score DESC, id LIMIT ?', (n,)).fetchall()
+        return self._entries(rows)
+
+    def rank(self, score):
+        with self._lock:
+            (better,) = self.db.execute('SELECT COUNT(*) FROM scores WHERE score > ?', (score,)).fetchone()
+        return better + 1
+
+    def history(self, name):
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT name, score, level, time FROM scores WHERE name = ? ORDER BY time', (name,)).fetchall()
+        return self._entries(rows)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+def open_store(path):
+    """Open the score store at path, SQLite for .db/.sqlite files and JSON otherwise."""
+    if os.path.splitext(path)[1] in ('.db', '.sqlite', '.sqlite3'):
+        return SQLiteScoreStore(path)
+    return JSONScoreStore(path)
+
+
+class HighScoreManager:
+    """Leaderboard front end that keeps disk I/O off the calling thread.
+
+    A background thread opens the store and loads the leaderboard, and
+    add_score() only queues the entry for it, so neither shows up in a frame.
+    Entries queued while a save is running are written together in one save.
+    get_high_scores() answers from memory and is empty until loading is done.
+    rank() and history() wait for the thread, so keep them out of the frame loop.
+    If the store could not be opened they answer as if it were empty.
+    """
+
+    def __init__(self, store=None, path=None):
+        self.store = store
+        self.path = path
+        self.loaded = threading.Event()
+        self._lock = threading.Lock()
+        self._top = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='highscores', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            if self.store is None:
+                self.store = open_store(self.path or default_scores_path())
+                if self.path is None:
+                    import_legacy_scores(self.store)
+            top = self.store.top(TOP_SCORES)
+            with self._lock:
+                # Keep scores added before loading finished
+                self._top = sorted(top + self._top, key=lambda x: x["score"], reverse=True)[:TOP_SCORES]
+        except Exception as e:
+            # Whatever went wrong, the writer loop below must still run or
+            # flush() would wait on the queue forever
+            print(f"Warning: could not load high scores: {e}")
+        finally:
+            self.loaded.set()
+
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [entry for entry in batch if entry is not None]
+            try:
+                if entries and self.store is not None:
+                    self.store.add(entries)
+            except Exception as e:
+                print(f"Warning: could not save high scores: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(entries) < len(batch):
+                if self.store is not None:
+                    self.store.close()
+                return
 
     def add_score(self, name, score, level):
-        entry = {"name": name, "score": score, "level": level}
-        self.high_scores.append(entry)
-        self.high_scores.sort(key=lambda x: x["score"], reverse=True)
-        self.high_scores = self.high_scores[:10]  # Keep only top 10
-        self._save_scores()
+        entry = {"name": name, "score": score, "level": level, "time": time.time()}
+        with self._lock:
+            self._top.append(entry)
+            self._top.sort(key=lambda x: x["score"], reverse=True)
+            del self._top[TOP_SCORES:]
+        self._queue.put(entry)
 
     def get_high_scores(self):
-        return self.high_scores 
\ No newline at end of file
+        with self._lock:
+            return list(self._top)
+
+    def flush(self):
+        """Block until every queued score is on disk."""
+        self.loaded.wait()
+        # Scores queued after close() have no writer left to wait for
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """Write out queued scores and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def top(self, n):
+        self.flush()
+        if self.store is None:
+            return []
+        return self.store.top(n)
+
+    def rank(self, score):
+        """Position score would take on the leaderboard, 1 being the best."""
+        self.flush()
+        if self.store is None:
+            return 1
+        return self.store.rank(score)
+
+    def history(self, name):
+        """Every score name has recorded, oldest first."""
+        self.flush()
+        if self.store is None:
+            return []
+        return self.store.history(name)
+
+
+_manager = None
+
+
+def get_manager():
+    """The process wide HighScoreManager, started on first use and closed at exit."""
+    global _manager
+    if _manager is None:
+        _manager = HighScoreManager()
+        atexit.register(_manager.close)
+    return _manager
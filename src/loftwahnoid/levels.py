@@ -0,0 +1,294 @@
+"""Level packs: hand-authored stages loaded from JSON.
+
+A pack file looks like this:
+
+    {
+      "name": "Classic",
+      "legend": {"X": {"type": "tough", "hits": 4}, "W": {"type": "normal", "hits": 2}},
+      "levels": [
+        {"rows": ["TTTTTTTTTT",
+                  "RRGGBBYYOO",
+                  "N.N.N.N.N."]},
+        {"rows": ["..XX..", "N2N3N4"], "brick_height": 30, "spacing": 8}
+      ]
+    }
+
+Every row of a level has the same length, one character per grid cell,
+and bricks are sized to fill the playfield width like the generated levels.
+The built-in characters are:
+
+    . or space   no brick
+    N            normal brick, random color
+    R G B Y O P  normal brick, red/green/blue/yellow/orange/purple
+    T            tough brick (2 hits)
+    2 to 9       tough brick taking that many hits
+
+and a pack or a single level can add its own in "legend", with a "type"
+("normal" or "tough"), optional "hits" and, for normal bricks, a "color"
+(one of the names above). A level can also set "brick_height", "spacing"
+and "top".
+
+Loading validates the whole pack and compiles it to a binary cache in the
+data directory, which later loads just memory-map until the pack changes:
+
+    python -m loftwahnoid.levels check pack.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import numpy as np
+from .constants import WIDTH, HEIGHT
+from .highscores import data_dir
+from .bricks import BrickStore, NORMAL, TOUGH, COLORS
+
+# Cache file layout, all little endian:
+#   header   magic, format version, level count, brick count, source mtime (ns), source size
+#   offsets  u32 per level + 1, index of the level's first brick
+#   rects    i32 x, y, width, height per brick
+#   types    u8 per brick
+#   hits     u8 per brick
+#   colors   i8 per brick, index into COLORS or -1 for a random one
+CACHE_MAGIC = b'LWLC'
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct('<4sHxxIIqq')
+
+COLOR_NAMES = ['red', 'green', 'blue', 'yellow', 'orange', 'purple']
+DEFAULT_LEGEND = {
+    'N': {'type': 'normal'},
+    'T': {'type': 'tough'},
+    **{name[0].upper(): {'type': 'normal', 'color': name} for name in COLOR_NAMES},
+    **{str(n): {'type': 'tough', 'hits': n} for n in range(2, 10)},
+}
+EMPTY = '. '
+TYPES = {'normal': NORMAL, 'tough': TOUGH}
+
+# Layout defaults, the same as generate_level
+BRICK_HEIGHT = 20
+SPACING = 5
+TOP = 50
+# Bricks must stay this far above the bottom, clear of the paddle
+BOTTOM_CLEARANCE = 100
+
+
+class LevelError(Exception):
+    pass
+
+
+def _is_int(value):
+    # JSON true and false load as bools, which are ints to isinstance
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _brick_spec(char, spec, where):
+    if not isinstance(spec, dict) or spec.get('type') not in TYPES:
+        raise LevelError(f"{where}: legend entry {char!r} needs a type of 'normal' or 'tough'")
+    kind = TYPES[spec['type']]
+    hits = spec.get('hits', 2 if kind == TOUGH else 1)
+    if not _is_int(hits) or not 1 <= hits <= 255:
+        raise LevelError(f"{where}: legend entry {char!r} has hits {hits!r}, expected 1 to 255")
+    color = spec.get('color')
+    if color is not None and color not in COLOR_NAMES:
+        raise LevelError(f"{where}: legend entry {char!r} has unknown color {color!r}")
+    if color is not None and kind == TOUGH:
+        raise LevelError(f"{where}: legend entry {char!r} is tough, tough bricks have fixed colors")
+    return kind, hits, COLOR_NAMES.index(color) if color else -1
+
+
+def _legend(base, extra, where):
+    if not isinstance(extra, dict):
+        raise LevelError(f"{where}: legend must be an object")
+    legend = dict(base)
+    for char, spec in extra.items():
+        if len(char) != 1 or char in EMPTY:
+            raise LevelError(f"{where}: legend key {char!r} must be a single non-blank character")
+        legend[char] = _brick_spec(char, spec, where)
+    return legend
+
+
+def compile_level(level, legend, where, size=(WIDTH, HEIGHT)):
+    """Validate one level and return a ((x, y, width, height), type, hits, color) tuple per brick.
+
+    Bricks are laid out for a playfield of the given width and height.
+    """
+    if not isinstance(level, dict):
+        raise LevelError(f"{where}: expected an object")
+    rows = level.get('rows')
+    if not rows or not isinstance(rows, list) or not all(isinstance(r, str) for r in rows):
+        raise LevelError(f"{where}: 'rows' must be a non-empty list of strings")
+    cols = len(rows[0])
+    if cols == 0 or any(len(row) != cols for row in rows):
+        raise LevelError(f"{where}: every row must have the same, non-zero length")
+    legend = _legend(legend, level.get('legend', {}), where)
+    brick_height = level.get('brick_height', BRICK_HEIGHT)
+    spacing = level.get('spacing', SPACING)
+    top = level.get('top', TOP)
+    for name, value in (('brick_height', brick_height), ('spacing', spacing), ('top', top)):
+        if not _is_int(value) or value < 0:
+            raise LevelError(f"{where}: {name} must be a non-negative integer")
+
+    width, height = size
+    brick_width = (width - (cols + 1) * spacing) / cols
+    if brick_width < 1 or brick_height < 1:
+        raise LevelError(f"{where}: {cols} columns do not fit the screen")
+    if top + len(rows) * (brick_height + spacing) > height - BOTTOM_CLEARANCE:
+        raise LevelError(f"{where}: {len(rows)} rows reach too far down the screen")
+
+    bricks = []
+    for r, row in enumerate(rows):
+        for c, char in enumerate(row):
+            if char in EMPTY:
+                continue
+            spec = legend.get(char)
+            if spec is None:
+                raise LevelError(f"{where}: unknown brick {char!r} in row {r + 1}")
+            x = spacing + c * (brick_width + spacing)
+            y = top + r * (brick_height + spacing)
+            # Truncated like pygame.Rect does for the generated levels
+            bricks.append(((int(x), int(y), int(brick_width), brick_height), *spec))
+    if not bricks:
+        raise LevelError(f"{where}: level has no bricks")
+    return bricks
+
+
+def parse_pack(data, where='pack', size=(WIDTH, HEIGHT)):
+    """Validate a decoded pack and return a list of compiled levels."""
+    if not isinstance(data, dict) or not isinstance(data.get('levels'), list) or not data['levels']:
+        raise LevelError(f"{where}: expected an object with a non-empty 'levels' list")
+    legend = {char: _brick_spec(char, spec, where) for char, spec in DEFAULT_LEGEND.items()}
+    legend = _legend(legend, data.get('legend', {}), where)
+    return [compile_level(level, legend, f"{where} level {i + 1}", size) for i, level in enumerate(data['levels'])]
+
+
+def _cache_path(path, size):
+    # Brick rects depend on the playfield, so each size gets its own cache
+    key = f"{os.path.abspath(path)}:{size[0]}x{size[1]}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(data_dir(), 'cache', f'{name}-{digest}.lwlc')
+
+
+def write_cache(path, pack, mtime_ns, size):
+    """Write a LevelPack's arrays to a cache file, replacing it atomically."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.levels-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(pack), len(pack.types), mtime_ns, size))
+            f.write(pack.offsets.astype('<u4').tobytes())
+            f.write(pack.rects.astype('<i4').tobytes())
+            for array in (pack.types, pack.hits, pack.colors):
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class LevelPack:
+    """A compiled level pack, brick arrays memory-mapped from its cache.
+
+    Levels are numbered from 1 like GameState.level and the pack starts over
+    after its last level.
+    """
+
+    def __init__(self, offsets, rects, types, hits, colors):
+        self.offsets = offsets
+        self.rects = rects
+        self.types = types
+        self.hits = hits
+        self.colors = colors
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_levels(cls, levels):
+        """Build a pack in memory from compile_level() results."""
+        offsets = np.zeros(len(levels) + 1, dtype=np.uint32)
+        offsets[1:] = np.cumsum([len(level) for level in levels])
+        bricks = [brick for level in levels for brick in level]
+        return cls(offsets,
+                   np.array([b[0] for b in bricks], dtype=np.int32),
+                   np.array([b[1] for b in bricks], dtype=np.uint8),
+                   np.array([b[2] for b in bricks], dtype=np.uint8),
+                   np.array([b[3] for b in bricks], dtype=np.int8))
+
+    @classmethod
+    def from_cache(cls, path, mtime_ns=None, size=None):
+        """Map a cache file, None if it is missing, stale or not a cache."""
+        try:
+            buf = np.memmap(path, dtype=np.uint8, mode='r')
+        except (OSError, ValueError):
+            return None
+        if len(buf) < CACHE_HEADER.size:
+            return None
+        magic, version, count, bricks, cached_mtime, cached_size = CACHE_HEADER.unpack(buf[:CACHE_HEADER.size])
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            return None
+        if mtime_ns is not None and (cached_mtime, cached_size) != (mtime_ns, size):
+            return None
+        if len(buf) != CACHE_HEADER.size + 4 * (count + 1) + 19 * bricks:
+            return None
+
+        pos = CACHE_HEADER.size
+        arrays = []
+        for dtype, length, shape in (('<u4', count + 1, (count + 1,)), ('<i4', bricks * 4, (bricks, 4)),
+                                     (np.uint8, bricks, (bricks,)), (np.uint8, bricks, (bricks,)),
+                                     (np.int8, bricks, (bricks,))):
+            nbytes = length * np.dtype(dtype).itemsize
+            arrays.append(buf[pos:pos + nbytes].view(dtype).reshape(shape))
+            pos += nbytes
+        return cls(*arrays)
+
+    @classmethod
+    def load(cls, path, size=(WIDTH, HEIGHT)):
+        """Load a pack file for a playfield size, through its cache when that is up to date."""
+        stat = os.stat(path)
+        cache = _cache_path(path, size)
+        pack = cls.from_cache(cache, stat.st_mtime_ns, stat.st_size)
+        if pack is not None:
+            return pack
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise LevelError(f"{path}: {e}") from None
+        pack = cls.from_levels(parse_pack(data, os.path.basename(path), size))
+        try:
+            write_cache(cache, pack, stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            print(f"Warning: could not write level cache: {e}")
+        return pack
+
+    def bricks(self, level, rng):
+        """Make the BrickStore of a level."""
+        i = (level - 1) % len(self)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        # Bricks without a color get a random one, drawn in level order
+        colors = self.colors[start:end].tolist()
+        choices = range(len(COLORS))
+        colors = [rng.choice(choices) if color < 0 else color for color in colors]
+        return BrickStore(self.rects[start:end], self.types[start:end], self.hits[start:end], colors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loftwahnoid.levels', description="Check and compile a level pack")
+    parser.add_argument('command', choices=['check'])
+    parser.add_argument('path')
+    args = parser.parse_args(argv)
+    try:
+        pack = LevelPack.load(args.path)
+    except (OSError, LevelError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"OK: {len(pack)} levels, {len(pack.types)} bricks, cached in {_cache_path(args.path, (WIDTH, HEIGHT))}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
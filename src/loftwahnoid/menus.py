@@ -1,31 +1,56 @@
+import os
+import time
+
+_started = time.perf_counter()
+
 import pygame
 import pygame_menu
 from .constants import WIDTH, HEIGHT
-from .game import game_loop
 
-def pause_menu(screen):
-    resume = [True]
+_imported = time.perf_counter()
 
-    def resume_game():
-        resume[0] = True
-        menu.disable()
 
-    def quit_to_menu():
-        resume[0] = False
-        menu.disable()
+def _play(screen, dirty_rects, replay_dir, levels, mega, autopilot=False):
+    # The game modules (and NumPy) load on the first Play, after the menu is up
+    from .game import game_loop
+    level_pack = None
+    if levels:
+        from .levels import LevelPack, LevelError
+        try:
+            level_pack = LevelPack.load(levels)
+        except (OSError, LevelError) as e:
+            print(f"Warning: could not load levels, using generated ones: {e}")
+    game_loop(screen, dirty_rects=dirty_rects, replay_dir=replay_dir, level_pack=level_pack, mega=mega,
+              autopilot=autopilot)
 
-    menu = pygame_menu.Menu('Paused', WIDTH, HEIGHT, theme=pygame_menu.themes.THEME_DARK)
-    menu.add.button('Resume', resume_game)
-    menu.add.button('Quit to Main Menu', quit_to_menu)
-    menu.mainloop(screen)
-    return resume[0]
 
 def main_menu():
+    init_start = time.perf_counter()
+    # pygame_menu refuses to work without a full pygame.init(), which also
+    # opens the mixer, so AudioManager reuses it rather than starting its own
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Loftwahnoid Supreme")
+    initialized = time.perf_counter()
+
     menu = pygame_menu.Menu('Loftwahnoid Supreme', WIDTH, HEIGHT, theme=pygame_menu.themes.THEME_DARK)
     menu.add.label("Welcome to Loftwahnoid!")
-    menu.add.button('Play', lambda: game_loop(screen))
+    # Dirty-rect rendering only pushes the parts of the screen that changed
+    dirty_rects = os.environ.get('LOFTWAHNOID_DIRTY_RECTS') == '1'
+    replay_dir = os.environ.get('LOFTWAHNOID_REPLAY_DIR')
+    levels = os.environ.get('LOFTWAHNOID_LEVELS')
+    mega = os.environ.get('LOFTWAHNOID_MEGA') == '1'
+    menu.add.button('Play', lambda: _play(screen, dirty_rects, replay_dir, levels, mega))
+    # The autopilot plays until a key is pressed
+    menu.add.button('Demo', lambda: _play(screen, dirty_rects, replay_dir, levels, mega, autopilot=True))
     menu.add.button('Quit', pygame_menu.events.EXIT)
-    menu.mainloop(screen) 
\ No newline at end of file
+
+    if os.environ.get('LOFTWAHNOID_STARTUP_TIMING') == '1':
+        menu.draw(screen)
+        pygame.display.flip()
+        shown = time.perf_counter()
+        print(f"Startup: imports {(_imported - _started) * 1000:.1f}ms, "
+              f"init {(initialized - init_start) * 1000:.1f}ms, "
+              f"menu {(shown - initialized) * 1000:.1f}ms, "
+              f"first frame {(shown - _started) * 1000:.1f}ms")
+    menu.mainloop(screen)
@@ -0,0 +1,99 @@
+import numpy as np
+import pygame
+
+# Alpha levels pre-rendered per color, particles fade through these stamps
+STAMP_LEVELS = 32
+STAMP_SIZE = 4
+
+
+class ParticleSystem:
+    """Shared particle store kept as parallel NumPy arrays.
+
+    Particles move by a fixed velocity each tick and fade out over their
+    lifetime. Aging and culling run as whole-array operations, and drawing
+    blits pre-rendered stamps, one per color and alpha level, so no surface
+    is built per particle. Positions are the top-left of the stamp.
+    """
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int16)
+        self.max_life = np.ones(capacity, dtype=np.int16)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.palette = []
+        self._color_index = {}
+        self._stamps = []
+
+    def _grow(self):
+        capacity = len(self.x) * 2
+        for name in ('x', 'y', 'vx', 'vy', 'life', 'max_life', 'color'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _color_id(self, color):
+        index = self._color_index.get(color)
+        if index is None:
+            index = self._color_index[color] = len(self.palette)
+            self.palette.append(color)
+        return index
+
+    def emit(self, x, y, life, color, vx=0, vy=0):
+        if self.count == len(self.x):
+            self._grow()
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.life[i] = life
+        self.max_life[i] = life
+        self.color[i] = self._color_id(color)
+        self.count += 1
+
+    def update(self):
+        n = self.count
+        if not n:
+            return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.life[:n] -= 1
+        alive = self.life[:n] > 0
+        kept = int(np.count_nonzero(alive))
+        if kept != n:
+            for arr in (self.x, self.y, self.vx, self.vy, self.life, self.max_life, self.color):
+                arr[:kept] = arr[:n][alive]
+            self.count = kept
+
+    def clear(self):
+        self.count = 0
+
+    def _stamps_for(self, color_id):
+        while len(self._stamps) <= color_id:
+            color = self.palette[len(self._stamps)][:3]
+            stamps = []
+            for level in range(STAMP_LEVELS):
+                alpha = 255 * (level + 1) // STAMP_LEVELS
+                surface = pygame.Surface((STAMP_SIZE, STAMP_SIZE), pygame.SRCALPHA)
+                pygame.draw.circle(surface, (*color, alpha), (STAMP_SIZE // 2, STAMP_SIZE // 2), STAMP_SIZE // 2)
+                stamps.append(surface)
+            self._stamps.append(stamps)
+        return self._stamps[color_id]
+
+    def draw(self, screen):
+        """Draw every particle and return the list of rects touched."""
+        n = self.count
+        if not n:
+            return []
+        levels = (self.life[:n].astype(np.int32) * STAMP_LEVELS // self.max_life[:n]) - 1
+        np.clip(levels, 0, STAMP_LEVELS - 1, out=levels)
+        xs = self.x[:n].astype(np.int32).tolist()
+        ys = self.y[:n].astype(np.int32).tolist()
+        stamps = [self._stamps_for(c) for c in range(len(self.palette))]
+        return screen.blits([(stamps[c][level], (x, y))
+                             for c, level, x, y in zip(self.color[:n].tolist(), levels.tolist(), xs, ys)])
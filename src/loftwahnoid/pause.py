@@ -1,19 +1,32 @@
 import pygame_menu
 from .constants import WIDTH, HEIGHT
 
-def pause_menu(screen):
-    resume = [True]
+# Built on first use and reused for every pause after that
+_menu = None
+_resume = [True]
+
 
+def _build_menu():
     def resume_game():
-        resume[0] = True
+        _resume[0] = True
         menu.disable()
 
     def quit_to_menu():
-        resume[0] = False
+        _resume[0] = False
         menu.disable()
 
     menu = pygame_menu.Menu('Paused', WIDTH, HEIGHT, theme=pygame_menu.themes.THEME_DARK)
     menu.add.button('Resume', resume_game)
     menu.add.button('Quit to Main Menu', quit_to_menu)
-    menu.mainloop(screen)
-    return resume[0] 
\ No newline at end of file
+    return menu
+
+
+def pause_menu(screen):
+    global _menu
+    if _menu is None:
+        _menu = _build_menu()
+    _resume[0] = True
+    _menu.enable()
+    _menu.full_reset()
+    _menu.mainloop(screen)
+    return _resume[0]
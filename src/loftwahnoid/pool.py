@@ -0,0 +1,29 @@
+class Pool:
+    """Free list of spare instances of cls, to recycle short-lived entities.
+
+    get(*args) hands back a released instance reinitialised through its
+    reset(*args) method, or a new cls(*args) when none are spare. Whoever
+    releases an instance must not use it again.
+    """
+
+    def __init__(self, cls, limit=256):
+        self.cls = cls
+        self.limit = limit
+        self.free = []
+
+    def get(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            return obj
+        return self.cls(*args)
+
+    def release(self, obj):
+        if len(self.free) < self.limit:
+            self.free.append(obj)
+
+    def release_all(self, objs):
+        """Release every instance in the list objs and empty it."""
+        for obj in objs:
+            self.release(obj)
+        objs.clear()
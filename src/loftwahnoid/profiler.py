@@ -0,0 +1,179 @@
+import atexit
+import json
+import os
+import time
+from collections import deque
+import numpy as np
+
+# Frames kept for the overlay statistics, ten seconds at 60 FPS
+HISTORY = 600
+# Sections kept for the trace file, older ones are dropped first
+TRACE_EVENTS = 500_000
+# Frames between refreshes of the overlay numbers
+OVERLAY_REFRESH = 30
+OVERLAY_FONT_SIZE = 20
+
+
+class NullProfiler:
+    """Stands in for FrameProfiler when profiling is off, every call does nothing."""
+
+    enabled = False
+    overlay = False
+
+    def start_frame(self):
+        pass
+
+    def lap(self, name):
+        pass
+
+    def end_frame(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class FrameProfiler:
+    """Times named sections of every frame.
+
+    Sections are contiguous: lap(name) charges the time since the previous
+    lap (or the start of the frame) to name, so timing a stretch of code costs
+    one call at its end. A section can lap several times in a frame, e.g. once
+    per simulation tick, and its times add up. The last HISTORY frames are
+    kept in a ring buffer for the percentiles shown by the overlay, and every
+    lap goes into a Chrome trace (chrome://tracing, Perfetto) written by
+    dump_trace().
+    """
+
+    enabled = True
+
+    def __init__(self, trace_path=None, history=HISTORY):
+        self.trace_path = trace_path
+        self.overlay = False
+        self.sections = []
+        self._index = {}
+        self.history = history
+        self.times = np.zeros((history, 0))
+        self.frame_times = np.zeros(history)
+        self.frames = 0
+        self._frame = []
+        self._start = self._last = self._origin = time.perf_counter()
+        self._trace = deque(maxlen=TRACE_EVENTS)
+        self._overlay_lines = []
+        self._overlay_surface = None
+
+    def _add_section(self, name):
+        index = self._index[name] = len(self.sections)
+        self.sections.append(name)
+        self._frame.append(0.0)
+        self.times = np.hstack([self.times, np.zeros((self.history, 1))])
+        return index
+
+    def start_frame(self):
+        self._start = self._last = time.perf_counter()
+        self._frame = [0.0] * len(self.sections)
+
+    def lap(self, name):
+        now = time.perf_counter()
+        index = self._index.get(name)
+        if index is None:
+            index = self._add_section(name)
+        elapsed = now - self._last
+        self._frame[index] += elapsed
+        self._trace.append((index, self._last, elapsed))
+        self._last = now
+
+    def end_frame(self):
+        now = time.perf_counter()
+        row = self.frames % self.history
+        self.times[row] = self._frame
+        self.frame_times[row] = now - self._start
+        self._trace.append((-1, self._start, now - self._start))
+        self.frames += 1
+        if self.overlay and self.frames % OVERLAY_REFRESH == 1:
+            self._overlay_lines = self.report()
+            self._overlay_surface = None
+
+    def stats(self):
+        """Return {section: (p50, p95, p99)} in milliseconds plus a 'frame' entry
+        with the whole frame's percentiles, and the worst frame in the window."""
+        n = min(self.frames, self.history)
+        if not n:
+            return {}, 0.0
+        result = {}
+        for name, column in zip(self.sections, self.times[:n].T):
+            result[name] = tuple(np.percentile(column, [50, 95, 99]) * 1000)
+        frames = self.frame_times[:n]
+        result['frame'] = tuple(np.percentile(frames, [50, 95, 99]) * 1000)
+        return result, float(frames.max()) * 1000
+
+    def report(self):
+        """Lines of text summarising stats(), as shown by the overlay."""
+        stats, worst = self.stats()
+        lines = [f"{'section':<16}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for name, (p50, p95, p99) in stats.items():
+            lines.append(f"{name:<16}{p50:7.2f}{p95:7.2f}{p99:7.2f}")
+        lines.append(f"worst frame {worst:.2f}ms of last {min(self.frames, self.history)}")
+        return lines
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        if self.overlay:
+            self._overlay_lines = self.report()
+            self._overlay_surface = None
+
+    def draw_overlay(self, screen, pos=(10, 10)):
+        """Draw the statistics in a box on screen and return its rect."""
+        if self._overlay_surface is None:
+            self._overlay_surface = self._render_overlay()
+        return screen.blit(self._overlay_surface, pos)
+
+    def _render_overlay(self):
+        import pygame
+        from .fonts import get_font
+
+        font = get_font(OVERLAY_FONT_SIZE)
+        line_height = font.get_linesize()
+        surfaces = [font.render(line, True, (0, 255, 0)) for line in self._overlay_lines]
+        width = max((s.get_width() for s in surfaces), default=0) + 10
+        box = pygame.Surface((width, line_height * len(surfaces) + 10), pygame.SRCALPHA)
+        box.fill((0, 0, 0, 180))
+        for i, surface in enumerate(surfaces):
+            box.blit(surface, (5, 5 + i * line_height))
+        return box
+
+    def dump_trace(self, path=None):
+        """Write the recorded sections to path as Chrome trace JSON."""
+        path = path or self.trace_path
+        if not path:
+            return
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'frames'}},
+                  {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 1, 'args': {'name': 'sections'}}]
+        for index, start, duration in self._trace:
+            events.append({
+                'name': self.sections[index] if index >= 0 else 'frame',
+                'ph': 'X',
+                'pid': 0,
+                'tid': 1 if index >= 0 else 0,
+                'ts': round((start - self._origin) * 1e6, 1),
+                'dur': round(duration * 1e6, 1),
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+_profiler = None
+
+
+def get_profiler():
+    """The process wide profiler. LOFTWAHNOID_PROFILE=<trace file> turns it on
+    and the trace is written there at exit, otherwise it is a NullProfiler."""
+    global _profiler
+    if _profiler is None:
+        trace_path = os.environ.get('LOFTWAHNOID_PROFILE')
+        if trace_path:
+            _profiler = FrameProfiler(trace_path)
+            atexit.register(_profiler.dump_trace)
+        else:
+            _profiler = NULL_PROFILER
+    return _profiler
@@ -0,0 +1,191 @@
+import pygame
+from .constants import TICK_RATE, BLACK, WHITE, YELLOW
+from .fonts import render_text
+from .profiler import NULL_PROFILER
+
+HUD_FONT_SIZE = 36
+
+
+class BrickLayer:
+    """Persistent surface holding the whole brick wall.
+
+    The wall is drawn once per level and afterwards only the bricks the
+    simulation reports as changed are redrawn, so a frame costs one blit of
+    the layer (which also clears the screen) instead of a draw per brick,
+    however many bricks the level has. Bricks are assumed not to overlap
+    each other.
+    """
+
+    def __init__(self, size):
+        self.surface = pygame.Surface(size)
+        self.layout_version = None
+
+    def rebuild(self, bricks):
+        self.surface.fill(BLACK)
+        bricks.draw(self.surface)
+
+    def redraw(self, bricks, i):
+        rect = bricks.rect(i)
+        self.surface.fill(BLACK, rect)
+        if bricks.is_alive(i):
+            bricks.draw_brick(self.surface, i)
+        return rect
+
+    def sync(self, state):
+        """Bring the layer up to date with the bricks in a GameState.
+
+        Returns the rects that changed, or None if the whole layer was rebuilt.
+        """
+        if self.layout_version != state.layout_version:
+            self.rebuild(state.bricks)
+            self.layout_version = state.layout_version
+            changed = None
+        else:
+            changed = [self.redraw(state.bricks, i) for i in state.changed_bricks]
+        state.changed_bricks.clear()
+        return changed
+
+    def draw(self, screen):
+        screen.blit(self.surface, (0, 0))
+
+
+def hud_lines(state):
+    """Return the (text, color, position) of every HUD line for a GameState."""
+    paddle = state.paddle
+    lines = [
+        (f'Score: {state.score}', WHITE, 'left'),
+        (f'Lives: {state.lives}', WHITE, 'center'),
+        (f'Level: {state.level}', WHITE, 'right'),
+    ]
+
+    if paddle.sticky:
+        time_left = state.timers.remaining('sticky', state.tick) // TICK_RATE
+        lines.append((f"Sticky: {time_left}s", YELLOW, 'status'))
+    if paddle.shooting:
+        time_left = state.timers.remaining('shooting', state.tick) // TICK_RATE
+        lines.append((f"Shooting: {time_left}s", YELLOW, 'status'))
+    if paddle.rect.width > paddle.original_width:
+        lines.append(("Wide Paddle", YELLOW, 'status'))
+    return lines
+
+
+def draw_hud(screen, lines):
+    width = screen.get_width()
+    rects = []
+    status_row = 0
+    for text, color, position in lines:
+        surface = render_text(text, HUD_FONT_SIZE, color)
+        if position == 'left':
+            pos = (20, 20)
+        elif position == 'center':
+            # Center align lives
+            pos = (width // 2 - surface.get_width() // 2, 20)
+        elif position == 'right':
+            # Right align level
+            pos = (width - surface.get_width() - 20, 20)
+        else:
+            # Power-up status goes below lives
+            pos = (width // 2 - surface.get_width() // 2, 60 + status_row * 30)
+            status_row += 1
+        rects.append(screen.blit(surface, pos))
+    return rects
+
+
+class Renderer:
+    """Draws a GameState to the screen.
+
+    By default every frame is redrawn and flipped. With dirty_rects the
+    renderer only restores the areas moving things covered last frame from
+    the brick layer, draws them in their new places and pushes just those
+    areas with pygame.display.update(). Static parts of the screen are not
+    touched, which is much cheaper on software rendered displays.
+
+    Drawing and presenting are timed as sections of profiler.
+    """
+
+    def __init__(self, screen, dirty_rects=False, profiler=NULL_PROFILER):
+        self.screen = screen
+        self.dirty_rects = dirty_rects
+        self.profiler = profiler
+        self.brick_layer = BrickLayer(screen.get_size())
+        self._full_redraw = True
+        self._last_rects = []
+        self._last_hud = None
+        self._hud_rects = []
+        self._pending = []
+
+    def invalidate(self):
+        """Force the next frame to be redrawn in full, e.g. after a menu covered the screen."""
+        self._full_redraw = True
+
+    def _draw_paddle(self, state, alpha):
+        # The paddle blinks yellow for a moment after catching a power-up
+        paddle = state.paddle
+        if paddle.flashing and (state.timers.remaining('flash', state.tick) // (TICK_RATE // 10)) % 2 == 0:
+            rect = paddle.interpolated_rect(alpha)
+            pygame.draw.rect(self.screen, YELLOW, rect)
+            return rect
+        return paddle.draw(self.screen, alpha)
+
+    def _draw_sprites(self, state, alpha):
+        screen = self.screen
+        rects = state.particles.draw(screen) if state.particles is not None else []
+        rects.append(state.ball.draw(screen, alpha))
+        rects.extend(state.extra_balls.draw(screen, alpha))
+        for power_up in state.power_ups:
+            rects.append(power_up.draw(screen, alpha))
+        return rects
+
+    def draw(self, state, alpha=1.0):
+        """Draw a frame. It is shown by the next call to present()."""
+        screen = self.screen
+        profiler = self.profiler
+        changed = self.brick_layer.sync(state)
+        lines = hud_lines(state)
+
+        if not self.dirty_rects or self._full_redraw or changed is None:
+            self.brick_layer.draw(screen)
+            profiler.lap('draw bricks')
+            rects = self._draw_sprites(state, alpha)
+            profiler.lap('draw sprites')
+            self._hud_rects = draw_hud(screen, lines)
+            profiler.lap('draw HUD')
+            rects.append(self._draw_paddle(state, alpha))
+            rects.extend(state.paddle.draw_bullets(screen, alpha))
+            profiler.lap('draw paddle')
+            self._last_rects = rects
+            self._last_hud = lines
+            self._pending = None
+            self._full_redraw = False
+            return
+
+        # Put the background back wherever something was drawn last frame,
+        # plus under bricks that changed and the HUD (redrawn below)
+        layer = self.brick_layer.surface
+        restore = self._last_rects + changed
+        for rect in restore + self._hud_rects:
+            screen.blit(layer, rect, rect)
+        profiler.lap('draw bricks')
+
+        rects = self._draw_sprites(state, alpha)
+        profiler.lap('draw sprites')
+        old_hud_rects = self._hud_rects
+        self._hud_rects = draw_hud(screen, lines)
+        profiler.lap('draw HUD')
+        rects.append(self._draw_paddle(state, alpha))
+        rects.extend(state.paddle.draw_bullets(screen, alpha))
+        profiler.lap('draw paddle')
+
+        pending = restore + rects
+        if lines != self._last_hud:
+            pending += old_hud_rects + self._hud_rects
+            self._last_hud = lines
+        self._last_rects = rects
+        self._pending = pending
+
+    def present(self):
+        if self._pending is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self._pending)
+        self.profiler.lap('flip')
@@ -0,0 +1,249 @@
+import argparse
+import itertools
+import struct
+import sys
+from .constants import TICK_RATE, WIDTH, HEIGHT
+from .simulation import GameState, Inputs, step
+
+# Replay file layout, all little endian:
+#   header  magic, format version, flags, seed, ticks, score, level, playfield width and height
+#   body    runs of (input code: u8, run length: varint) until the end of the file
+MAGIC = b'LWRP'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sBBIIIHHH')
+
+FLAG_SWEPT = 1
+FLAG_MEGA = 2
+
+# Bits of a per-tick input code
+LEFT = 1
+RIGHT = 2
+FIRE = 4
+LAUNCH = 8
+PAUSED = 16  # Pause menu was opened before this tick, ignored by the simulation
+
+
+class ReplayError(Exception):
+    pass
+
+
+def encode_inputs(inputs, paused=False):
+    code = 0
+    if inputs.left:
+        code |= LEFT
+    if inputs.right:
+        code |= RIGHT
+    if inputs.fire:
+        code |= FIRE
+    if inputs.launch:
+        code |= LAUNCH
+    if paused:
+        code |= PAUSED
+    return code
+
+
+def decode_inputs(code):
+    return Inputs(bool(code & LEFT), bool(code & RIGHT), bool(code & FIRE), bool(code & LAUNCH))
+
+
+def _write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("Truncated replay")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """A recorded game: the seed, the settings and one input code per tick.
+
+    score, level and ticks are what the recording claims the game ended
+    with, verify() checks them by playing the inputs back on a playfield of
+    the recorded size.
+    """
+
+    def __init__(self, seed, swept_collision=False, runs=None, ticks=0, score=0, level=1, mega=False,
+                 size=(WIDTH, HEIGHT)):
+        self.seed = seed
+        self.swept_collision = swept_collision
+        self.mega = mega
+        self.size = tuple(size)
+        self.runs = runs if runs is not None else []
+        self.ticks = ticks
+        self.score = score
+        self.level = level
+
+    def codes(self):
+        """The input code of every tick, never more than ticks of them."""
+        runs = (itertools.repeat(code, length) for code, length in self.runs)
+        return itertools.islice(itertools.chain.from_iterable(runs), self.ticks)
+
+    def to_bytes(self):
+        flags = (FLAG_SWEPT if self.swept_collision else 0) | (FLAG_MEGA if self.mega else 0)
+        out = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, flags, self.seed, self.ticks, self.score, self.level,
+                                       *self.size))
+        for code, length in self.runs:
+            out.append(code)
+            _write_varint(out, length)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("Not a replay file")
+        magic, version, flags, seed, ticks, score, level, width, height = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("Not a replay file")
+        if version != FORMAT_VERSION:
+            raise ReplayError(f"Unsupported replay version {version}")
+        runs = []
+        total = 0
+        pos = HEADER.size
+        while pos < len(data):
+            code = data[pos]
+            length, pos = _read_varint(data, pos + 1)
+            runs.append((code, length))
+            total += length
+            # Checked as runs are read, so a huge run is rejected before anything plays it
+            if total > ticks:
+                break
+        if total != ticks:
+            raise ReplayError(f"Replay inputs cover {total} ticks, the header says {ticks}")
+        return cls(seed, bool(flags & FLAG_SWEPT), runs, ticks, score, level, bool(flags & FLAG_MEGA), (width, height))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    """Run-length encodes the inputs of a game as it is played."""
+
+    def __init__(self, seed, swept_collision=False, mega=False, size=(WIDTH, HEIGHT)):
+        self.replay = Replay(seed, swept_collision, mega=mega, size=size)
+        self._code = None
+        self._length = 0
+
+    def record(self, inputs, paused=False):
+        code = encode_inputs(inputs, paused)
+        if code == self._code:
+            self._length += 1
+        else:
+            if self._length:
+                self.replay.runs.append((self._code, self._length))
+            self._code = code
+            self._length = 1
+        self.replay.ticks += 1
+
+    def finish(self, state):
+        """Close the recording with the result of the game and return the Replay."""
+        if self._length:
+            self.replay.runs.append((self._code, self._length))
+            self._code = None
+            self._length = 0
+        self.replay.score = state.score
+        self.replay.level = state.level
+        return self.replay
+
+
+def new_state(replay, effects=False, level_pack=None):
+    return GameState(swept_collision=replay.swept_collision, effects=effects, seed=replay.seed,
+                     level_pack=level_pack, mega=replay.mega, size=replay.size)
+
+
+def simulate(replay, level_pack=None):
+    """Play a replay back headlessly as fast as possible and return the final GameState.
+
+    Games played on a level pack only replay on the same pack.
+    """
+    state = new_state(replay, level_pack=level_pack)
+    for code in replay.codes():
+        if state.game_over:
+            break
+        step(state, decode_inputs(code))
+    return state
+
+
+def verify(replay, level_pack=None):
+    """Return True if playing the replay back gives the score and level it claims."""
+    state = simulate(replay, level_pack)
+    return state.tick == replay.ticks and state.score == replay.score and state.level == replay.level
+
+
+def play(screen, replay, speed=1.0, level_pack=None):
+    """Show a replay on screen at speed times real time. ESC stops it."""
+    import pygame
+    from .render import Renderer
+
+    state = new_state(replay, effects=True, level_pack=level_pack)
+    renderer = Renderer(screen)
+    clock = pygame.time.Clock()
+    codes = replay.codes()
+    tick_ms = 1000 / (TICK_RATE * speed)
+    accumulator = 0.0
+    finished = False
+
+    while not finished:
+        accumulator += clock.tick(60)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                return state
+        while accumulator >= tick_ms and not finished:
+            accumulator -= tick_ms
+            code = next(codes, None)
+            if code is None or state.game_over:
+                finished = True
+            else:
+                step(state, decode_inputs(code))
+        renderer.draw(state, min(accumulator / tick_ms, 1.0))
+        renderer.present()
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loftwahnoid.replay', description="Verify or watch a replay")
+    parser.add_argument('command', choices=['verify', 'play'])
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float, default=1.0, help="Playback speed for play")
+    parser.add_argument('--levels', help="Level pack the game was played on")
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.path)
+    level_pack = None
+    if args.levels:
+        from .levels import LevelPack
+        level_pack = LevelPack.load(args.levels)
+    if args.command == 'verify':
+        ok = verify(replay, level_pack)
+        print(f"{'OK' if ok else 'MISMATCH'}: score {replay.score}, level {replay.level}, {replay.ticks} ticks")
+        return 0 if ok else 1
+
+    import pygame
+    pygame.init()
+    screen = pygame.display.set_mode(replay.size)
+    pygame.display.set_caption("Loftwahnoid Supreme - Replay")
+    play(screen, replay, args.speed, level_pack)
+    pygame.quit()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
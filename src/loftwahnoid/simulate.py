@@ -0,0 +1,188 @@
+"""Monte-Carlo balance simulator.
+
+Plays many headless games with a scripted paddle across a multiprocessing
+pool and summarises how far they get, for every combination of the
+power-up spawn scale and tough brick curve given on the command line:
+
+    python -m loftwahnoid.simulate --games 2000 --spawn-scale 0.5,1,1.5 --output sweep.csv
+
+With --autopilot the games are played by the demo mode's Autopilot instead,
+which rarely loses a ball, for soak tests of long games and later levels.
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+import numpy as np
+from .constants import TICK_RATE
+from .autopilot import Autopilot
+from .simulation import GameState, Inputs, step, POWERUP_SPAWN_RATES, TOUGH_BRICK_CURVE, EVENT_LEVEL_COMPLETE
+
+# Ten minutes of play, long enough for a strong paddle to clear several levels
+DEFAULT_MAX_TICKS = 10 * 60 * TICK_RATE
+
+
+class ScriptedPaddle:
+    """Follows the ball with an aiming error, so games end like a human's do.
+
+    Every time the ball turns back down the paddle picks a new aiming error,
+    normally distributed with a spread of (1 - skill) * 60 pixels (about half
+    the paddle), so a skill of 1 tracks perfectly and lower skills miss more
+    often.
+    """
+
+    def __init__(self, skill, rng):
+        self.skill = skill
+        self.rng = rng
+        self.error = 0
+        self.falling = False
+
+    def inputs(self, state):
+        ball = state.ball
+        falling = ball.vel_y > 0
+        if falling and not self.falling:
+            self.error = self.rng.gauss(0, (1 - self.skill) * 60)
+        self.falling = falling
+        target = ball.x + self.error
+        center = state.paddle.rect.centerx
+        return Inputs(left=target < center - 3, right=target > center + 3, fire=True, launch=True)
+
+
+def play_game(task):
+    """Play one game and return its statistics. Runs in a worker process."""
+    point, params, seed, skill, max_ticks, swept, autopilot = task
+    spawn_rates = {kind: rate * params['spawn_scale'] for kind, rate in POWERUP_SPAWN_RATES.items()}
+    tough_curve = (params['tough_base'], params['tough_step'], params['tough_cap'])
+    state = GameState(swept_collision=swept, effects=False, seed=seed,
+                      spawn_rates=spawn_rates, tough_curve=tough_curve)
+    paddle = Autopilot() if autopilot else ScriptedPaddle(skill, random.Random(seed))
+
+    level_ticks = []
+    level_start = 0
+    sticky = shooting = wide = 0
+    while not state.game_over and state.tick < max_ticks:
+        events = step(state, paddle.inputs(state))
+        if EVENT_LEVEL_COMPLETE in events:
+            level_ticks.append(state.tick - level_start)
+            level_start = state.tick
+        p = state.paddle
+        sticky += p.sticky
+        shooting += p.shooting
+        wide += p.rect.width > p.original_width
+
+    ticks = max(state.tick, 1)
+    return {
+        'point': point,
+        'score': state.score,
+        'level': state.level,
+        'ticks': state.tick,
+        'level_ticks': level_ticks,
+        'sticky_uptime': sticky / ticks,
+        'shooting_uptime': shooting / ticks,
+        'wide_uptime': wide / ticks,
+        'finished': state.game_over,
+    }
+
+
+def summarize(params, games):
+    scores = np.array([g['score'] for g in games])
+    levels = np.array([g['level'] for g in games])
+    level_ticks = [t for g in games for t in g['level_ticks']]
+    p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+    return {
+        **params,
+        'games': len(games),
+        'score_mean': float(scores.mean()),
+        'score_std': float(scores.std()),
+        'score_p10': float(p10),
+        'score_p50': float(p50),
+        'score_p90': float(p90),
+        'level_mean': float(levels.mean()),
+        'level_max': int(levels.max()),
+        'level_counts': {int(level): int(count) for level, count in zip(*np.unique(levels, return_counts=True))},
+        'seconds_per_level': float(np.mean(level_ticks)) / TICK_RATE if level_ticks else None,
+        'game_seconds_mean': float(np.mean([g['ticks'] for g in games])) / TICK_RATE,
+        'timed_out': sum(not g['finished'] for g in games),
+        'sticky_uptime': float(np.mean([g['sticky_uptime'] for g in games])),
+        'shooting_uptime': float(np.mean([g['shooting_uptime'] for g in games])),
+        'wide_uptime': float(np.mean([g['wide_uptime'] for g in games])),
+    }
+
+
+def run_sweep(grid, games, skill=0.4, max_ticks=DEFAULT_MAX_TICKS, swept=False, workers=None, seed=0,
+              autopilot=False):
+    """Play games per point of grid across a process pool and return one summary per point."""
+    seeds = random.Random(seed)
+    tasks = [(point, params, seeds.getrandbits(32), skill, max_ticks, swept, autopilot)
+             for point, params in enumerate(grid) for _ in range(games)]
+    results = [[] for _ in grid]
+
+    with multiprocessing.Pool(workers) as pool:
+        chunksize = max(1, len(tasks) // ((workers or multiprocessing.cpu_count()) * 8))
+        for game in pool.imap_unordered(play_game, tasks, chunksize):
+            results[game['point']].append(game)
+    return [summarize(params, games) for params, games in zip(grid, results)]
+
+
+def write_results(summaries, path):
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(summaries, f, indent=2)
+        return
+    fields = [key for key in summaries[0] if key != 'level_counts']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(summaries)
+
+
+def _positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def _floats(text):
+    return [float(value) for value in text.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loftwahnoid.simulate', description=__doc__.split('\n')[0])
+    parser.add_argument('--games', type=_positive_int, default=500, help="Games per parameter combination")
+    parser.add_argument('--workers', type=_positive_int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--skill', type=float, default=0.4, help="Scripted paddle skill from 0 to 1")
+    parser.add_argument('--max-ticks', type=int, default=DEFAULT_MAX_TICKS, help="Stop games after this many ticks")
+    parser.add_argument('--swept', action='store_true', help="Use swept ball collision")
+    parser.add_argument('--autopilot', action='store_true', help="Play with the autopilot instead of the scripted paddle")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn-scale', type=_floats, default=[1.0],
+                        help="Comma separated multipliers for every power-up spawn rate")
+    parser.add_argument('--tough-base', type=_floats, default=[TOUGH_BRICK_CURVE[0]])
+    parser.add_argument('--tough-step', type=_floats, default=[TOUGH_BRICK_CURVE[1]])
+    parser.add_argument('--tough-cap', type=_floats, default=[TOUGH_BRICK_CURVE[2]])
+    parser.add_argument('--output', default='simulation.csv', help="Results file, .csv or .json")
+    args = parser.parse_args(argv)
+
+    grid = [dict(spawn_scale=a, tough_base=b, tough_step=c, tough_cap=d)
+            for a, b, c, d in itertools.product(args.spawn_scale, args.tough_base, args.tough_step, args.tough_cap)]
+    start = time.perf_counter()
+    summaries = run_sweep(grid, args.games, args.skill, args.max_ticks, args.swept, args.workers, args.seed,
+                          args.autopilot)
+    elapsed = time.perf_counter() - start
+    write_results(summaries, args.output)
+
+    for summary in summaries:
+        print(f"spawn x{summary['spawn_scale']:g} tough {summary['tough_base']:g}/{summary['tough_step']:g}"
+              f"/{summary['tough_cap']:g}: score {summary['score_mean']:.0f} (p50 {summary['score_p50']:.0f}), "
+              f"level {summary['level_mean']:.2f}")
+    print(f"{len(grid) * args.games} games in {elapsed:.1f}s, results in {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
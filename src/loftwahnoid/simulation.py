@@ -0,0 +1,451 @@
+import math
+import random
+import numpy as np
+import pygame
+from .constants import WIDTH, HEIGHT
+from .sprites.paddle import Paddle, bullet_pool
+from .sprites.ball import Ball, BallSet
+from .sprites.powerup import PowerUp, power_up_pool
+from .bricks import BrickStore, NORMAL, TOUGH, COLORS
+from .particles import ParticleSystem
+from .profiler import NULL_PROFILER
+from .timers import Scheduler
+from .collision import sweep_circle_box, sweep_circle_rect, sweep_circle_walls, reflect
+
+# Power-up spawn rates (45% total chance of any power-up spawning per brick)
+POWERUP_SPAWN_RATES = {
+    PowerUp.WIDE_PADDLE: 0.15,      # 15% chance
+    PowerUp.EXTRA_LIFE: 0.05,       # 5% chance (rarer)
+    PowerUp.STICKY_PADDLE: 0.10,    # 10% chance
+    PowerUp.SHOOTING_PADDLE: 0.10,  # 10% chance
+    PowerUp.MULTI_BALL: 0.05        # 5% chance
+}
+
+# Chance of a tough brick outside the top row: (base, increase per level, max)
+TOUGH_BRICK_CURVE = (0.1, 0.05, 0.4)
+
+# Events reported by step() so the caller can play sounds etc.
+EVENT_DING = 'ding'
+EVENT_DEATH = 'death'
+EVENT_LIFE = 'life'
+EVENT_POWERUP = 'powerup'
+EVENT_LEVEL_COMPLETE = 'level_complete'
+
+# Multi-ball splits every ball into three, turned this far apart (radians)
+SPLIT_ANGLE = 0.35
+# Most balls in play at once, counting the main ball
+MAX_BALLS = 256
+
+# Mega board bricks: size, gap between them and how far down the playfield they reach
+MEGA_BRICK_SIZE = (24, 10)
+MEGA_SPACING = 2
+MEGA_DEPTH = 0.55
+
+# Most contacts the swept ball resolves in a single step, the rest of the move is dropped
+MAX_SWEEP_HITS = 8
+
+
+class Inputs:
+    """Player input for a single simulation step.
+
+    left/right/fire mirror the held keys, launch is a SPACE key press this step.
+    """
+
+    def __init__(self, left=False, right=False, fire=False, launch=False):
+        self.left = left
+        self.right = right
+        self.fire = fire
+        self.launch = launch
+
+
+def generate_level(level, rng=random, tough_curve=TOUGH_BRICK_CURVE, width=WIDTH):
+    rects = []
+    types = []
+    colors = []
+    rows = 5  # Back to fixed 5 rows
+    cols = 10
+    spacing = 5
+    brick_width = (width - (cols + 1) * spacing) / cols
+    brick_height = 20
+    color_choices = range(len(COLORS))
+
+    # Increase chance of tough bricks with level
+    base, per_level, cap = tough_curve
+    tough_brick_chance = min(base + (level * per_level), cap)  # Max 40% chance by default
+
+    for row in range(rows):
+        for col in range(cols):
+            x = spacing + col * (brick_width + spacing)
+            y = 50 + row * (brick_height + spacing)
+
+            # Make top row always tough bricks
+            if row == 0:
+                brick_type = TOUGH
+            # Random tough bricks for other rows based on level
+            elif rng.random() < tough_brick_chance:
+                brick_type = TOUGH
+            else:
+                brick_type = NORMAL
+
+            # Truncated like pygame.Rect
+            rects.append((int(x), int(y), int(brick_width), brick_height))
+            types.append(brick_type)
+            colors.append(rng.choice(color_choices))
+
+    hits = [2 if t == TOUGH else 1 for t in types]
+    return BrickStore(rects, types, hits, colors)
+
+
+def generate_mega_level(level, rng=random, tough_curve=TOUGH_BRICK_CURVE, width=WIDTH, height=HEIGHT):
+    """A wall of small bricks filling the top of the playfield, thousands of them on big screens."""
+    brick_width, brick_height = MEGA_BRICK_SIZE
+    cols = (width - MEGA_SPACING) // (brick_width + MEGA_SPACING)
+    rows = int(height * MEGA_DEPTH - 50) // (brick_height + MEGA_SPACING)
+    # Centre the wall, the columns rarely divide the width exactly
+    left = (width - cols * (brick_width + MEGA_SPACING) + MEGA_SPACING) // 2
+    col, row = np.meshgrid(np.arange(cols), np.arange(rows))
+    rects = np.empty((rows * cols, 4), dtype=np.int32)
+    rects[:, 0] = left + col.ravel() * (brick_width + MEGA_SPACING)
+    rects[:, 1] = 50 + row.ravel() * (brick_height + MEGA_SPACING)
+    rects[:, 2] = brick_width
+    rects[:, 3] = brick_height
+
+    # Too many bricks to roll one at a time, a generator seeded from rng keeps it deterministic
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+    base, per_level, cap = tough_curve
+    tough = np_rng.random(len(rects)) < min(base + level * per_level, cap)
+    tough[:cols] = True
+    types = np.where(tough, TOUGH, NORMAL)
+    hits = np.where(tough, 2, 1)
+    colors = np_rng.integers(0, len(COLORS), len(rects))
+    return BrickStore(rects, types, hits, colors)
+
+
+class GameState:
+    """Everything needed to simulate a game, with no display or wall clock.
+
+    With swept_collision the ball is moved with continuous circle-vs-rect
+    sweeps, so fast balls cannot tunnel through bricks or the paddle and
+    bounce off whichever face they actually hit.
+
+    effects=False skips cosmetic particles, for runs nobody watches.
+
+    All randomness comes from two streams seeded from seed: rng for anything
+    that affects play (level layout, power-up rolls, serve direction) and
+    fx_rng for cosmetic effects. The same seed and the same inputs always
+    play out the same game, with or without effects.
+
+    spawn_rates and tough_curve override POWERUP_SPAWN_RATES and
+    TOUGH_BRICK_CURVE, for balance experiments.
+
+    With a level_pack (a levels.LevelPack) the levels come from the pack
+    instead of generate_level, with mega they are generate_mega_level walls
+    of thousands of small bricks.
+
+    size is the playfield's width and height, by default the screen size
+    from constants.
+
+    Set profiler to a FrameProfiler to have step() time its sections.
+    """
+
+    def __init__(self, swept_collision=False, effects=True, seed=None,
+                 spawn_rates=POWERUP_SPAWN_RATES, tough_curve=TOUGH_BRICK_CURVE, level_pack=None,
+                 mega=False, size=(WIDTH, HEIGHT)):
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.fx_rng = random.Random(f'{seed}-fx')
+        self.swept_collision = swept_collision
+        self.spawn_rates = spawn_rates
+        self.tough_curve = tough_curve
+        self.level_pack = level_pack
+        self.mega = mega
+        self.width, self.height = size
+        self.particles = ParticleSystem() if effects else None
+        self.profiler = NULL_PROFILER
+        paddle_width = 100
+        paddle_height = 10
+        # Timed effects, in ticks so they stop whenever the simulation does
+        self.timers = Scheduler()
+        self.paddle = Paddle(self.width // 2 - paddle_width // 2, self.height - 30, paddle_width, paddle_height, 7,
+                             self.timers, self.width)
+        self.ball = Ball(self.width // 2, self.height - 50, 8, 5, self.width)
+        self.ball.started = False  # Ball starts inactive
+        # Balls added by multi-ball, on top of the main ball
+        self.extra_balls = BallSet(self.ball.radius, self.ball.speed, field_width=self.width)
+
+        self.score = 0
+        self.lives = 3
+        self.level = 1
+        # Bumped on every new layout, changed_bricks lists the indices of the
+        # bricks hit since the renderer last looked, so it can redraw only those
+        self.layout_version = 0
+        self.changed_bricks = []
+        self.load_level(self.level)
+        self.power_ups = []
+        self.game_over = False
+
+        # Simulation ticks elapsed, every timer in the game counts these
+        self.tick = 0
+
+    def reset_ball(self):
+        ball = self.ball
+        ball.x = ball.prev_x = self.paddle.rect.centerx
+        ball.y = ball.prev_y = self.paddle.rect.top - ball.radius
+        ball.started = False
+        ball.vel_x = 0
+        ball.vel_y = 0
+
+    def load_level(self, level):
+        # self.bricks is a BrickStore, len() of it counts the bricks left
+        if self.level_pack is not None:
+            self.bricks = self.level_pack.bricks(level, self.rng)
+        elif self.mega:
+            self.bricks = generate_mega_level(level, self.rng, self.tough_curve, self.width, self.height)
+        else:
+            self.bricks = generate_level(level, self.rng, self.tough_curve, self.width)
+        self.layout_version += 1
+        self.changed_bricks.clear()
+
+    def hit_brick(self, i):
+        """Hit brick i, removing it and scoring if it breaks. Returns True if it broke."""
+        self.changed_bricks.append(i)
+        if not self.bricks.hit(i):
+            return False
+        self.score += 20 if self.bricks.types[i] == TOUGH else 10
+        return True
+
+
+def _spawn_power_up(state, i):
+    # Roll for powerup spawn
+    rates = state.spawn_rates
+    if state.rng.random() < sum(rates.values()):
+        power_type = state.rng.choices(
+            list(rates.keys()),
+            weights=list(rates.values()),
+            k=1
+        )[0]
+        x, y = state.bricks.center(i)
+        spawn_x = max(20, min(x, state.width - 20))
+        state.power_ups.append(power_up_pool.get(spawn_x, y, power_type))
+
+
+def _bounce_off_paddle(ball, paddle):
+    ball.vel_y = -abs(ball.vel_y)
+    offset = (ball.x - paddle.rect.centerx) / (paddle.rect.width / 2)
+    ball.vel_x = ball.speed * offset
+
+
+def _stick_to_paddle(ball, paddle):
+    ball.stuck_to_paddle = True
+    ball.started = False
+    ball.vel_x = 0
+    ball.vel_y = 0
+    ball.y = paddle.rect.top - ball.radius - 2
+
+
+def _hit_brick(state, i, events):
+    if state.hit_brick(i):
+        _spawn_power_up(state, i)
+    events.append(EVENT_DING)
+
+
+def _split_balls(state):
+    ball = state.ball
+    extras = state.extra_balls
+    extras.split(SPLIT_ANGLE, MAX_BALLS - 1)
+    if ball.started and len(extras) + 2 < MAX_BALLS:
+        for angle in (SPLIT_ANGLE, -SPLIT_ANGLE):
+            c, s = math.cos(angle), math.sin(angle)
+            extras.add(ball.x, ball.y, ball.vel_x * c - ball.vel_y * s, ball.vel_x * s + ball.vel_y * c)
+
+
+def _update_extra_balls(state, events):
+    extras = state.extra_balls
+    if not len(extras):
+        return
+    extras.update()
+    extras.bounce_off_paddle(state.paddle)
+
+    hits = extras.first_brick_hits(state.bricks)
+    for i in np.flatnonzero(hits >= 0).tolist():
+        brick = int(hits[i])
+        # Another ball may have broken it earlier this tick, it still bounces
+        if state.bricks.is_alive(brick):
+            _hit_brick(state, brick, events)
+        extras.vel_y[i] = -extras.vel_y[i]
+
+    # Extra balls that fall out are simply gone
+    extras.keep(extras.y[:extras.count] - extras.radius <= state.height)
+
+
+def _earliest_contact(state, x, y, dx, dy, radius):
+    # Returns (t, nx, ny, target) where target is a brick index, the paddle or None for a wall
+    best = sweep_circle_walls(x, y, dx, dy, radius, state.width)
+    if best is not None:
+        best = best + (None,)
+    hit = sweep_circle_rect(x, y, dx, dy, radius, state.paddle.rect)
+    if hit is not None and (best is None or hit[0] < best[0]):
+        best = hit + (state.paddle,)
+
+    sweep = pygame.Rect(min(x, x + dx) - radius, min(y, y + dy) - radius,
+                        abs(dx) + radius * 2 + 1, abs(dy) + radius * 2 + 1)
+    bricks = state.bricks
+    # Candidates come in index order, so on a tie the earlier brick is kept
+    for i in bricks.candidates(sweep):
+        hit = sweep_circle_box(x, y, dx, dy, radius, *bricks.box(i))
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = hit + (i,)
+    return best
+
+
+def _move_ball_swept(state, events):
+    ball = state.ball
+    paddle = state.paddle
+    remaining = 1.0
+    for _ in range(MAX_SWEEP_HITS):
+        dx = ball.vel_x * remaining
+        dy = ball.vel_y * remaining
+        contact = _earliest_contact(state, ball.x, ball.y, dx, dy, ball.radius)
+        if contact is None:
+            ball.x += dx
+            ball.y += dy
+            return
+        t, nx, ny, target = contact
+        ball.x += dx * t
+        ball.y += dy * t
+        remaining *= 1 - t
+
+        if target is paddle:
+            if paddle.sticky:
+                _stick_to_paddle(ball, paddle)
+                return
+            if ny < 0:
+                _bounce_off_paddle(ball, paddle)
+                continue
+        ball.vel_x, ball.vel_y = reflect(ball.vel_x, ball.vel_y, nx, ny)
+        if target is not None and target is not paddle:
+            _hit_brick(state, target, events)
+
+
+def step(state, inputs):
+    """Advance the game by one tick and return the list of events that happened."""
+    if state.game_over:
+        return []
+
+    events = []
+    profiler = state.profiler
+    paddle = state.paddle
+    ball = state.ball
+    state.tick += 1
+    now = state.tick
+
+    # Remember where things were so rendering can interpolate between ticks
+    ball.prev_x, ball.prev_y = ball.x, ball.y
+    paddle.prev_x = paddle.rect.x
+
+    if inputs.launch:
+        if not ball.started:
+            ball.start(state.rng)  # Initialize velocities when starting
+        elif paddle.sticky and ball.stuck_to_paddle:
+            # Release ball from sticky paddle
+            ball.started = True
+            ball.stuck_to_paddle = False
+            _bounce_off_paddle(ball, paddle)
+
+    state.timers.run(now)
+    paddle.update(inputs, now)
+    profiler.lap('input')
+
+    # Always update power-ups regardless of ball state
+    for power_up in state.power_ups[:]:  # Use slice to safely remove while iterating
+        power_up.update(now, state.particles, state.fx_rng)
+        # Remove if fallen off screen
+        if power_up.y > state.height:
+            state.power_ups.remove(power_up)
+            power_up_pool.release(power_up)
+        # Check collision with paddle
+        elif paddle.rect.colliderect(power_up.rect):
+            state.lives = power_up.apply_effect(paddle, state.lives, now)
+            if power_up.power_type == PowerUp.MULTI_BALL:
+                _split_balls(state)
+            events.append(EVENT_LIFE if power_up.power_type == PowerUp.EXTRA_LIFE else EVENT_POWERUP)
+            state.power_ups.remove(power_up)
+            power_up_pool.release(power_up)
+    profiler.lap('power-ups')
+
+    if ball.started and state.swept_collision:
+        _move_ball_swept(state, events)
+        ball.update_trail(now, state.particles)
+    elif ball.started:
+        ball.update(now, state.particles)
+    else:
+        # Keep ball on paddle until space is pressed
+        ball.x = paddle.rect.centerx
+        ball.y = paddle.rect.top - ball.radius
+
+    if state.particles is not None:
+        state.particles.update()
+
+    # Check if ball should be released when sticky expires
+    if ball.stuck_to_paddle and not paddle.sticky:
+        ball.start(state.rng)  # Release ball with initial velocity
+    profiler.lap('ball update')
+
+    # Only check collisions if ball is in motion
+    if ball.started:
+        if not state.swept_collision:
+            # Ball collision with paddle
+            if ball.get_rect().colliderect(paddle.rect):
+                if paddle.sticky:
+                    if not ball.stuck_to_paddle:
+                        # Stick ball where it hits
+                        _stick_to_paddle(ball, paddle)
+                else:
+                    _bounce_off_paddle(ball, paddle)
+
+            # Ball collision with bricks
+            brick_hit = state.bricks.first_hit(ball.get_rect())
+            if brick_hit >= 0:
+                _hit_brick(state, brick_hit, events)
+                ball.vel_y = -ball.vel_y
+            profiler.lap('brick collision')
+
+        # Check bullet collisions with bricks
+        for bullet in paddle.bullets[:]:
+            brick_hit = state.bricks.first_hit(bullet.rect)
+            if brick_hit >= 0:
+                state.hit_brick(brick_hit)
+                paddle.bullets.remove(bullet)
+                bullet_pool.release(bullet)
+                events.append(EVENT_DING)
+        profiler.lap('bullet collision')
+
+    _update_extra_balls(state, events)
+    profiler.lap('extra balls')
+
+    # Check game over conditions
+    if ball.y - ball.radius > state.height and len(state.extra_balls):
+        # Another ball is still in play, it takes over as the main ball
+        ball.x, ball.y, ball.vel_x, ball.vel_y = state.extra_balls.pop()
+        ball.prev_x, ball.prev_y = ball.x, ball.y
+    elif ball.y - ball.radius > state.height:
+        state.lives -= 1
+        events.append(EVENT_DEATH)
+        if state.lives <= 0:
+            state.game_over = True
+        else:
+            state.reset_ball()
+            paddle.rect.width = 100  # Reset paddle width to normal
+
+    # Level complete
+    if not state.bricks:
+        state.level += 1
+        state.reset_ball()
+        state.extra_balls.clear()
+        state.load_level(state.level)
+        events.append(EVENT_LEVEL_COMPLETE)
+    profiler.lap('rules')
+
+    return events
@@ -1,9 +1,14 @@
+import math
+import numpy as np
 import pygame
 import random
-from ..constants import WIDTH, YELLOW
+from ..constants import WIDTH, TICK_RATE, YELLOW
 
 class Ball:
-    def __init__(self, x, y, radius, speed):
+    __slots__ = ('x', 'y', 'radius', 'speed', 'vel_x', 'vel_y', 'started', 'stuck_to_paddle',
+                 'last_particle_time', 'prev_x', 'prev_y', 'field_width')
+
+    def __init__(self, x, y, radius, speed, field_width=WIDTH):
         self.x = x
         self.y = y
         self.radius = radius
@@ -12,55 +17,174 @@ class Ball:
         self.vel_y = 0  # Start with no velocity
         self.started = False  # Ball starts inactive
         self.stuck_to_paddle = False  # Add this new flag
-        self.particles = []
-        self.last_particle_time = pygame.time.get_ticks()
+        self.last_particle_time = 0
+        # Position at the start of the last tick, for interpolation
+        self.prev_x = x
+        self.prev_y = y
+        self.field_width = field_width
 
-    def start(self):
-        self.vel_x = random.choice([-1, 1]) * self.speed
+    def start(self, rng=random):
+        self.vel_x = rng.choice([-1, 1]) * self.speed
         self.vel_y = -self.speed
         self.started = True
         self.stuck_to_paddle = False  # Reset stuck status when starting
 
-    def update(self):
+    def update(self, now, particles=None):
         if not self.stuck_to_paddle:  # Only update position if not stuck
             self.x += self.vel_x
             self.y += self.vel_y
             # Bounce off left/right walls
-            if self.x - self.radius <= 0 or self.x + self.radius >= WIDTH:
+            if self.x - self.radius <= 0 or self.x + self.radius >= self.field_width:
                 self.vel_x = -self.vel_x
             # Bounce off top wall
             if self.y - self.radius <= 0:
                 self.vel_y = -self.vel_y
-            
-            # Add particles
-            current_time = pygame.time.get_ticks()
-            if current_time - self.last_particle_time > 50:  # Spawn every 50ms
-                self.particles.append({
-                    'x': self.x,
-                    'y': self.y,
-                    'life': 20,
-                    'color': YELLOW
-                })
-                self.last_particle_time = current_time
-            
-            # Update particles
-            for particle in self.particles[:]:
-                particle['life'] -= 1
-                if particle['life'] <= 0:
-                    self.particles.remove(particle)
-
-    def draw(self, screen):
-        # Draw particles
-        for particle in self.particles:
-            alpha = int(255 * (particle['life'] / 20))
-            particle_color = (*YELLOW[:3], alpha)
-            surface = pygame.Surface((4, 4), pygame.SRCALPHA)
-            pygame.draw.circle(surface, particle_color, (2, 2), 2)
-            screen.blit(surface, (int(particle['x'] - 2), int(particle['y'] - 2)))
-        
+            self.update_trail(now, particles)
+
+    def update_trail(self, now, particles=None):
+        # Add particles
+        if particles is not None and now - self.last_particle_time > TICK_RATE // 20:  # Spawn every 50ms
+            particles.emit(self.x - 2, self.y - 2, 20, YELLOW)
+            self.last_particle_time = now
+
+    def draw(self, screen, alpha=1.0):
         # Draw ball (no pulsing)
-        pygame.draw.circle(screen, YELLOW, (int(self.x), int(self.y)), self.radius)
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        return pygame.draw.circle(screen, YELLOW, (int(x), int(y)), self.radius)
 
     def get_rect(self):
         return pygame.Rect(self.x - self.radius, self.y - self.radius,
-                         self.radius * 2, self.radius * 2) 
\ No newline at end of file
+                         self.radius * 2, self.radius * 2) 
+
+
+class BallSet:
+    """Any number of extra balls, stored as parallel NumPy arrays.
+
+    Multi-ball play can put hundreds of balls on screen, so instead of a Ball
+    object each, positions and velocities live in arrays and every ball is
+    moved, wall-bounced, tested against the paddle and the bricks in a few
+    whole-array operations. Extra balls use the discrete overlap test, bounce
+    off a sticky paddle instead of sticking and never cost a life.
+    """
+
+    def __init__(self, radius, speed, capacity=16, field_width=WIDTH):
+        self.radius = radius
+        self.speed = speed
+        self.field_width = field_width
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vel_x = np.zeros(capacity)
+        self.vel_y = np.zeros(capacity)
+        self.prev_x = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        self._stamp = None
+
+    def __len__(self):
+        return self.count
+
+    def _arrays(self):
+        return (self.x, self.y, self.vel_x, self.vel_y, self.prev_x, self.prev_y)
+
+    def add(self, x, y, vel_x, vel_y):
+        """Add balls, each argument being a number or an array of them."""
+        x, y, vel_x, vel_y = np.broadcast_arrays(*(np.atleast_1d(v).astype(float) for v in (x, y, vel_x, vel_y)))
+        n = self.count
+        needed = n + len(x)
+        if needed > len(self.x):
+            capacity = max(needed, len(self.x) * 2)
+            for name in ('x', 'y', 'vel_x', 'vel_y', 'prev_x', 'prev_y'):
+                old = getattr(self, name)
+                new = np.zeros(capacity)
+                new[:n] = old[:n]
+                setattr(self, name, new)
+        self.x[n:needed] = self.prev_x[n:needed] = x
+        self.y[n:needed] = self.prev_y[n:needed] = y
+        self.vel_x[n:needed] = vel_x
+        self.vel_y[n:needed] = vel_y
+        self.count = needed
+
+    def keep(self, mask):
+        """Keep only the balls where mask is True."""
+        kept = int(np.count_nonzero(mask))
+        if kept != self.count:
+            for arr in self._arrays():
+                arr[:kept] = arr[:self.count][mask]
+            self.count = kept
+
+    def pop(self):
+        """Remove the last ball and return its (x, y, vel_x, vel_y)."""
+        self.count -= 1
+        i = self.count
+        return float(self.x[i]), float(self.y[i]), float(self.vel_x[i]), float(self.vel_y[i])
+
+    def clear(self):
+        self.count = 0
+
+    def update(self):
+        n = self.count
+        x, y, vel_x, vel_y = self.x[:n], self.y[:n], self.vel_x[:n], self.vel_y[:n]
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        x += vel_x
+        y += vel_y
+        # Bounce off left/right walls
+        sides = (x - self.radius <= 0) | (x + self.radius >= self.field_width)
+        vel_x[sides] *= -1
+        # Bounce off top wall
+        vel_y[y - self.radius <= 0] *= -1
+
+    def overlapping(self, left, top, right, bottom):
+        """Mask of the balls whose bounding box overlaps the given box."""
+        n = self.count
+        r = self.radius
+        x, y = self.x[:n], self.y[:n]
+        return (x + r > left) & (x - r < right) & (y + r > top) & (y - r < bottom)
+
+    def bounce_off_paddle(self, paddle):
+        hit = self.overlapping(paddle.rect.left, paddle.rect.top, paddle.rect.right, paddle.rect.bottom)
+        if hit.any():
+            n = self.count
+            self.vel_y[:n][hit] = -np.abs(self.vel_y[:n][hit])
+            offset = (self.x[:n][hit] - paddle.rect.centerx) / (paddle.rect.width / 2)
+            self.vel_x[:n][hit] = self.speed * offset
+
+    def first_brick_hits(self, bricks):
+        """For every ball, the index of the first live brick of a BrickStore it overlaps, or -1."""
+        n = self.count
+        r = self.radius
+        hits = np.full(n, -1)
+        if not n or not bricks:
+            return hits
+        # Only balls down among the bricks need a look in the store's grid
+        near = np.flatnonzero(self.overlapping(*bricks.bounds)).tolist()
+        xs = self.x[:n].tolist()
+        ys = self.y[:n].tolist()
+        for i in near:
+            hits[i] = bricks.first_hit_box(xs[i] - r, ys[i] - r, xs[i] + r, ys[i] + r)
+        return hits
+
+    def split(self, angle, limit):
+        """Add two copies of every ball, turned by +angle and -angle, up to limit balls."""
+        n = min(self.count, max(0, (limit - self.count) // 2))
+        if not n:
+            return
+        x, y, vel_x, vel_y = self.x[:n].copy(), self.y[:n].copy(), self.vel_x[:n].copy(), self.vel_y[:n].copy()
+        for a in (angle, -angle):
+            c, s = math.cos(a), math.sin(a)
+            self.add(x, y, vel_x * c - vel_y * s, vel_x * s + vel_y * c)
+
+    def draw(self, screen, alpha=1.0):
+        """Draw every ball and return the list of rects touched."""
+        n = self.count
+        if not n:
+            return []
+        if self._stamp is None:
+            size = self.radius * 2 + 1
+            self._stamp = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(self._stamp, YELLOW, (self.radius, self.radius), self.radius)
+        xs = (self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha).astype(int) - self.radius
+        ys = (self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha).astype(int) - self.radius
+        stamp = self._stamp
+        return screen.blits([(stamp, pos) for pos in zip(xs.tolist(), ys.tolist())])
@@ -1,48 +1,47 @@
 import pygame
-from ..constants import WIDTH, WHITE, YELLOW, BLACK
+from ..constants import WIDTH, TICK_RATE, WHITE, YELLOW, BLACK
+from ..fonts import render_text
+from ..timers import Scheduler
+from ..pool import Pool
+
+# Effect lengths in ticks
+STICKY_DURATION = 15 * TICK_RATE
+SHOOTING_DURATION = 7 * TICK_RATE
+FLASH_DURATION = TICK_RATE // 2
 
 class Paddle:
-    def __init__(self, x, y, width, height, speed):
+    def __init__(self, x, y, width, height, speed, timers=None, field_width=WIDTH):
         self.rect = pygame.Rect(x, y, width + 20, height + 5)  # Slightly larger paddle
         self.original_width = width + 20  # Adjust original width
         self.speed = speed
+        self.field_width = field_width
+        # Ends the timed effects below, the owner runs it every tick
+        self.timers = timers if timers is not None else Scheduler()
         self.sticky = False
-        self.sticky_timer = 0
-        self.sticky_duration = 10000  # 10 seconds
         self.shooting = False
-        self.shoot_timer = 0
-        self.shoot_cooldown = 750  # Increased from 500 to 750ms
+        self.flashing = False
+        self.shoot_cooldown = TICK_RATE * 3 // 4  # Increased from 500 to 750ms
         self.last_shot = 0
         self.bullets = []
-        
-    def update(self, keys):
-        current_time = pygame.time.get_ticks()
-        
+        self.prev_x = self.rect.x  # Position at the start of the last tick, for interpolation
+
+    def update(self, inputs, current_time):
         # Movement
-        if keys[pygame.K_LEFT]:
+        if inputs.left:
             self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT]:
+        if inputs.right:
             self.rect.x += self.speed
             
         # Clamp within screen bounds
         if self.rect.left < 0:
             self.rect.left = 0
-        if self.rect.right > WIDTH:
-            self.rect.right = WIDTH
-            
-        # Check sticky timer
-        if self.sticky and current_time - self.sticky_timer > self.sticky_duration:
-            self.sticky = False
-            
-        # Check shooting timer
-        if self.shooting and current_time - self.shoot_timer > 7000:  # 7 seconds
-            self.shooting = False
-            self.bullets.clear()
-            
+        if self.rect.right > self.field_width:
+            self.rect.right = self.field_width
+
         # Handle shooting
-        if self.shooting and keys[pygame.K_SPACE]:
+        if self.shooting and inputs.fire:
             if current_time - self.last_shot > self.shoot_cooldown and len(self.bullets) < 3:
-                self.bullets.append(Bullet(self.rect.centerx, self.rect.top))
+                self.bullets.append(bullet_pool.get(self.rect.centerx, self.rect.top))
                 self.last_shot = current_time
                 
         # Update bullets
@@ -50,55 +49,99 @@ class Paddle:
             bullet.update()
             if bullet.rect.bottom < 0:  # Remove if off screen
                 self.bullets.remove(bullet)
+                bullet_pool.release(bullet)
+
+    def make_sticky(self, now, duration=STICKY_DURATION):
+        self.sticky = True
+        self.timers.start('sticky', now, duration, self._end_sticky)
+
+    def _end_sticky(self):
+        self.sticky = False
+
+    def start_shooting(self, now, duration=SHOOTING_DURATION):
+        self.shooting = True
+        self.shoot_cooldown = TICK_RATE // 2  # Faster shooting (was 750ms)
+        self.timers.start('shooting', now, duration, self._end_shooting)
+
+    def _end_shooting(self):
+        self.shooting = False
+        bullet_pool.release_all(self.bullets)
+
+    def flash(self, now, duration=FLASH_DURATION):
+        self.flashing = True
+        self.timers.start('flash', now, duration, self._end_flash)
+
+    def _end_flash(self):
+        self.flashing = False
+
+    def interpolated_rect(self, alpha=1.0):
+        rect = self.rect.copy()
+        rect.x = round(self.prev_x + (self.rect.x - self.prev_x) * alpha)
+        return rect
+
+    def draw(self, screen, alpha=1.0):
+        """Draw the paddle and return the area it covers."""
+        rect = self.interpolated_rect(alpha)
 
-    def draw(self, screen):
         # Rounded rectangle with slight gradient
-        paddle_surface = pygame.Surface((self.rect.width, self.rect.height + 10), pygame.SRCALPHA)
-        pygame.draw.rect(paddle_surface, WHITE, (0, 0, self.rect.width, self.rect.height), border_radius=10)
-        pygame.draw.rect(paddle_surface, (200, 200, 200), (2, 2, self.rect.width - 4, self.rect.height - 4), border_radius=8)
-        screen.blit(paddle_surface, (self.rect.x, self.rect.y - 5))
+        paddle_surface = pygame.Surface((rect.width, rect.height + 10), pygame.SRCALPHA)
+        pygame.draw.rect(paddle_surface, WHITE, (0, 0, rect.width, rect.height), border_radius=10)
+        pygame.draw.rect(paddle_surface, (200, 200, 200), (2, 2, rect.width - 4, rect.height - 4), border_radius=8)
+        screen.blit(paddle_surface, (rect.x, rect.y - 5))
         
         # Adjust font size based on paddle width
-        font_size = min(int(self.rect.width / 8), 16)  # Scale font with paddle width, max 16px
-        font = pygame.font.SysFont(None, font_size)
-        text = font.render("Loftwahnoid", True, BLACK)
+        font_size = min(int(rect.width / 8), 16)  # Scale font with paddle width, max 16px
+        text = render_text("Loftwahnoid", font_size, BLACK)
         
         # Center text on paddle
-        text_x = self.rect.centerx - text.get_width() // 2
-        text_y = self.rect.centery - text.get_height() // 2 - 2  # Slight upward adjustment
+        text_x = rect.centerx - text.get_width() // 2
+        text_y = rect.centery - text.get_height() // 2 - 2  # Slight upward adjustment
         screen.blit(text, (text_x, text_y))
         
         # Original power-up indicators
         if self.sticky:
-            for x in range(self.rect.left + 10, self.rect.right - 5, 10):
-                pygame.draw.circle(screen, YELLOW, (x, self.rect.top + 2), 2)
+            for x in range(rect.left + 10, rect.right - 5, 10):
+                pygame.draw.circle(screen, YELLOW, (x, rect.top + 2), 2)
         if self.shooting:
             pygame.draw.polygon(screen, YELLOW, [
-                (self.rect.left + 5, self.rect.top + 5),
-                (self.rect.left + 10, self.rect.top),
-                (self.rect.left + 15, self.rect.top + 5)
+                (rect.left + 5, rect.top + 5),
+                (rect.left + 10, rect.top),
+                (rect.left + 15, rect.top + 5)
             ])
             pygame.draw.polygon(screen, YELLOW, [
-                (self.rect.right - 15, self.rect.top + 5),
-                (self.rect.right - 10, self.rect.top),
-                (self.rect.right - 5, self.rect.top + 5)
+                (rect.right - 15, rect.top + 5),
+                (rect.right - 10, rect.top),
+                (rect.right - 5, rect.top + 5)
             ])
-        for bullet in self.bullets:
-            bullet.draw(screen)
+        return pygame.Rect(rect.x, rect.y - 5, rect.width, rect.height + 10)
+
+    def draw_bullets(self, screen, alpha=1.0):
+        return [bullet.draw(screen, alpha) for bullet in self.bullets]
 
     def reset_width(self):
         self.rect.width = self.original_width
         self.sticky = False
         self.shooting = False
-        self.bullets.clear()
+        self.timers.cancel('sticky')
+        self.timers.cancel('shooting')
+        bullet_pool.release_all(self.bullets)
 
 class Bullet:
+    __slots__ = ('rect',)
+    speed = 8
+
     def __init__(self, x, y):
         self.rect = pygame.Rect(x - 2, y - 8, 4, 8)
-        self.speed = 8
+
+    def reset(self, x, y):
+        self.rect.topleft = (x - 2, y - 8)
 
     def update(self):
         self.rect.y -= self.speed
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, YELLOW, self.rect) 
\ No newline at end of file
+    def draw(self, screen, alpha=1.0):
+        # Bullets fly at a constant speed, so step back by the part of the tick not yet shown
+        return pygame.draw.rect(screen, YELLOW, self.rect.move(0, round(self.speed * (1 - alpha)))) 
+
+# Spent bullets, reused for the next shots
+bullet_pool = Pool(Bullet)
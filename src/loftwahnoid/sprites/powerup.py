@@ -1,5 +1,7 @@
 import pygame
-from ..constants import WIDTH, HEIGHT, WHITE, GREEN, RED, BLUE, YELLOW
+from ..constants import TICK_RATE, WHITE, GREEN, RED, BLUE, YELLOW
+from ..fonts import render_text
+from ..pool import Pool
 import random
 
 class PowerUp:
@@ -8,73 +10,67 @@ class PowerUp:
     EXTRA_LIFE = "extra_life"
     STICKY_PADDLE = "sticky_paddle"
     SHOOTING_PADDLE = "shooting_paddle"
+    MULTI_BALL = "multi_ball"
     
+    # Shared by every power-up of a type
+    colors = {
+        WIDE_PADDLE: GREEN,
+        EXTRA_LIFE: RED,
+        STICKY_PADDLE: BLUE,
+        SHOOTING_PADDLE: YELLOW,
+        MULTI_BALL: (255, 165, 0)
+    }
+    width = 20
+    height = 20
+    speed = 3
+
+    __slots__ = ('x', 'y', 'power_type', 'color', 'rect', 'last_particle_time')
+
     def __init__(self, x, y, power_type):
+        self.rect = pygame.Rect(0, 0, self.width, self.height)
+        self.reset(x, y, power_type)
+
+    def reset(self, x, y, power_type):
         self.x = x
         self.y = y
         self.power_type = power_type
-        self.width = 20
-        self.height = 20
-        self.speed = 3
-        self.rect = pygame.Rect(self.x - self.width // 2, self.y - self.height // 2, 
-                              self.width, self.height)
-        
+        self.rect.topleft = (self.x - self.width // 2, self.y - self.height // 2)
         # Set color based on power-up type
-        self.colors = {
-            self.WIDE_PADDLE: GREEN,
-            self.EXTRA_LIFE: RED,
-            self.STICKY_PADDLE: BLUE,
-            self.SHOOTING_PADDLE: YELLOW
-        }
         self.color = self.colors.get(power_type, WHITE)
-        self.particles = []
-        self.last_particle_time = pygame.time.get_ticks()
+        self.last_particle_time = 0
 
-    def update(self):
+    def update(self, now, particles=None, rng=random):
         self.y += self.speed
         self.rect.y = self.y - self.height // 2
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_particle_time > 100:
-            self.particles.append({
-                'x': self.x + random.randint(-5, 5),
-                'y': self.y - self.height // 2,
-                'life': 30,
-                'color': self.color
-            })
-            self.last_particle_time = current_time
-        for particle in self.particles[:]:
-            particle['y'] -= 1
-            particle['life'] -= 1
-            if particle['life'] <= 0:
-                self.particles.remove(particle)
+        if particles is not None and now - self.last_particle_time > TICK_RATE // 10:  # Spawn every 100ms
+            # Particles drift upwards as the power-up falls
+            particles.emit(self.x + rng.randint(-5, 5), self.y - self.height // 2, 30, self.color, vy=-1)
+            self.last_particle_time = now
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
+        # Power-ups fall at a constant speed, so step back by the part of the tick not yet shown
+        y = self.y - self.speed * (1 - alpha)
         current_time = pygame.time.get_ticks()
         scale = 1.0 + 0.3 * abs((current_time % 1000) / 500 - 1)
         scaled_width = int(self.width * scale)
         scaled_height = int(self.height * scale)
         scaled_rect = pygame.Rect(
             self.x - scaled_width // 2,
-            self.y - scaled_height // 2,
+            y - scaled_height // 2,
             scaled_width,
             scaled_height
         )
-        for particle in self.particles:
-            alpha = int(255 * (particle['life'] / 30))
-            particle_color = (*self.color[:3], alpha)
-            surface = pygame.Surface((4, 4), pygame.SRCALPHA)
-            pygame.draw.circle(surface, particle_color, (2, 2), 2)
-            screen.blit(surface, (int(particle['x']), int(particle['y'])))
-        outline_surface = pygame.Surface((scaled_width + 4, scaled_height + 4), pygame.SRCALPHA)
+        outline_rect = pygame.Rect(self.x - scaled_width // 2 - 2, y - scaled_height // 2 - 2,
+                                   scaled_width + 4, scaled_height + 4)
+        outline_surface = pygame.Surface(outline_rect.size, pygame.SRCALPHA)
         pygame.draw.rect(outline_surface, (*WHITE[:3], 100), (2, 2, scaled_width, scaled_height), 2)
-        screen.blit(outline_surface, (self.x - scaled_width // 2 - 2, self.y - scaled_height // 2 - 2))
+        screen.blit(outline_surface, outline_rect)
         pygame.draw.rect(screen, self.color, scaled_rect)
-        font = pygame.font.SysFont(None, 12)
+        text = render_text("L", 12, WHITE)
         if self.power_type == self.WIDE_PADDLE:
             pygame.draw.line(screen, WHITE, 
                             (scaled_rect.left + 4, scaled_rect.centery),
                             (scaled_rect.right - 4, scaled_rect.centery), 2)
-            text = font.render("L", True, WHITE)
             screen.blit(text, (scaled_rect.centerx - 3, scaled_rect.centery - 5))
         elif self.power_type == self.EXTRA_LIFE:
             pygame.draw.line(screen, WHITE,
@@ -83,12 +79,10 @@ class PowerUp:
             pygame.draw.line(screen, WHITE,
                             (scaled_rect.left + 4, scaled_rect.centery),
                             (scaled_rect.right - 4, scaled_rect.centery), 2)
-            text = font.render("L", True, WHITE)
             screen.blit(text, (scaled_rect.centerx - 3, scaled_rect.centery - 5))
         elif self.power_type == self.STICKY_PADDLE:
             for x in range(scaled_rect.left + 5, scaled_rect.right - 2, 5):
                 pygame.draw.circle(screen, WHITE, (x, scaled_rect.centery), 2)
-            text = font.render("L", True, WHITE)
             screen.blit(text, (scaled_rect.centerx - 3, scaled_rect.centery - 5))
         elif self.power_type == self.SHOOTING_PADDLE:
             points = [
@@ -97,10 +91,14 @@ class PowerUp:
                 (scaled_rect.centerx + 4, scaled_rect.centery)
             ]
             pygame.draw.polygon(screen, WHITE, points)
-            text = font.render("L", True, WHITE)
             screen.blit(text, (scaled_rect.centerx - 3, scaled_rect.bottom - 10))
+        elif self.power_type == self.MULTI_BALL:
+            for dx in (-5, 0, 5):
+                pygame.draw.circle(screen, WHITE, (scaled_rect.centerx + dx, scaled_rect.top + 6), 2)
+            screen.blit(text, (scaled_rect.centerx - 3, scaled_rect.centery - 2))
+        return outline_rect
 
-    def apply_effect(self, paddle, lives):
+    def apply_effect(self, paddle, lives, now):
         if self.power_type in [self.WIDE_PADDLE, self.STICKY_PADDLE, self.SHOOTING_PADDLE]:
             paddle.reset_width()
         
@@ -109,11 +107,11 @@ class PowerUp:
         elif self.power_type == self.EXTRA_LIFE:
             lives += 2  # Give 2 lives instead of 1
         elif self.power_type == self.STICKY_PADDLE:
-            paddle.sticky = True
-            paddle.sticky_timer = pygame.time.get_ticks()
-            paddle.sticky_duration = 15000  # Increased to 15s
+            paddle.make_sticky(now)
         elif self.power_type == self.SHOOTING_PADDLE:
-            paddle.shooting = True
-            paddle.shoot_timer = pygame.time.get_ticks()
-            paddle.shoot_cooldown = 500  # Faster shooting (was 750)
-        return lives 
\ No newline at end of file
+            paddle.start_shooting(now)
+        paddle.flash(now)
+        return lives 
+
+# Collected or missed power-ups, reused for the next drops
+power_up_pool = Pool(PowerUp)
@@ -0,0 +1,570 @@
+"""Spectator streaming: live games shown on other screens.
+
+With LOFTWAHNOID_STREAM=<address> the game publishes every tick to any
+number of spectators, who watch with
+
+    python -m loftwahnoid.stream watch <address>
+
+An address is host:port, a bare port (on 127.0.0.1) or unix:<path>.
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import socket
+import stat
+import struct
+import sys
+import threading
+import zlib
+import numpy as np
+from .constants import TICK_RATE
+from .bricks import BrickStore
+from .timers import Scheduler
+from .sprites.ball import Ball, BallSet
+from .sprites.paddle import Paddle, bullet_pool
+from .sprites.powerup import PowerUp
+
+# Messages are a u32 length followed by a body starting with its type byte,
+# all little endian:
+#   HELLO   magic, protocol version, playfield width and height
+#   LAYOUT  layout id, brick seq, brick count, then zlib compressed arrays:
+#           i16 x, y, width, height, u8 type, u8 hits required, u8 color, u8 hits
+#   FRAME   tick, score, lives, level, layout id, main ball, paddle, effect
+#           timers, entity counts, then i16 x, y per extra ball, i16 x, y per
+#           bullet, i16 x, y and u8 kind per power-up, and last the brick delta:
+#           brick seq, count, u32 index and u8 hits per changed brick
+#   ACK     (spectator to server) layout id and the brick seq it has applied
+# A layout id names one BrickStore for the life of the server, games played
+# one after another never share one.
+PROTOCOL_VERSION = 2
+MAGIC = b'LWST'
+LENGTH = struct.Struct('<I')
+HELLO = struct.Struct('<B4sBHH')
+LAYOUT = struct.Struct('<BIII')
+FRAME = struct.Struct('<BIIHHIffhhHBHHHHHH')
+DELTA = struct.Struct('<II')
+ACK = struct.Struct('<BII')
+MSG_HELLO, MSG_LAYOUT, MSG_FRAME, MSG_ACK = range(1, 5)
+
+# Paddle flags in a FRAME
+STICKY = 1
+SHOOTING = 2
+FLASHING = 4
+
+POWER_TYPES = [PowerUp.WIDE_PADDLE, PowerUp.EXTRA_LIFE, PowerUp.STICKY_PADDLE, PowerUp.SHOOTING_PADDLE,
+               PowerUp.MULTI_BALL]
+_POWER_CODES = {kind: i for i, kind in enumerate(POWER_TYPES)}
+
+# A spectator with this much unsent data is skipped until it catches up
+MAX_BACKLOG = 64 * 1024
+
+
+class StreamError(Exception):
+    pass
+
+
+def parse_address(address):
+    """Split an address into ('unix', path) or ('tcp', (host, port))."""
+    if address.startswith('unix:'):
+        return 'unix', address[5:]
+    host, _, port = address.rpartition(':')
+    try:
+        return 'tcp', (host or '127.0.0.1', int(port))
+    except ValueError:
+        raise StreamError(f"Bad stream address {address!r}, expected host:port, port or unix:<path>") from None
+
+
+def _message(body):
+    return LENGTH.pack(len(body)) + body
+
+
+def encode_frame(state, layout=None):
+    """The FRAME fields every spectator gets, without the brick delta.
+
+    layout is the id of the state's bricks, state.layout_version by default.
+    """
+    if layout is None:
+        layout = state.layout_version
+    ball = state.ball
+    paddle = state.paddle
+    extras = state.extra_balls
+    n = extras.count
+    flags = 0
+    if paddle.sticky:
+        flags |= STICKY
+    if paddle.shooting:
+        flags |= SHOOTING
+    if paddle.flashing:
+        flags |= FLASHING
+    timers = state.timers
+    bullets = [c for bullet in paddle.bullets for c in bullet.rect.topleft]
+    power_ups = state.power_ups
+    parts = [
+        FRAME.pack(MSG_FRAME, state.tick, state.score, state.lives, state.level, layout,
+                   ball.x, ball.y, paddle.rect.x, paddle.rect.y, paddle.rect.width, flags,
+                   timers.remaining('sticky', state.tick), timers.remaining('shooting', state.tick),
+                   timers.remaining('flash', state.tick), n, len(paddle.bullets), len(power_ups)),
+        struct.pack(f'<{len(bullets)}h', *bullets),
+    ]
+    if n:
+        parts.insert(1, np.stack((extras.x[:n], extras.y[:n]), axis=1).astype('<i2').tobytes())
+    for power_up in power_ups:
+        parts.append(struct.pack('<hhB', int(power_up.x), int(power_up.y), _POWER_CODES[power_up.power_type]))
+    return b''.join(parts)
+
+
+class Frame:
+    """A decoded FRAME message, see decode_frame()."""
+
+    def __init__(self, fields, balls, bullets, power_ups, seq, indices, hits):
+        (_, self.tick, self.score, self.lives, self.level, self.layout, self.ball_x, self.ball_y,
+         self.paddle_x, self.paddle_y, self.paddle_width, self.flags, self.sticky, self.shooting,
+         self.flash, _, _, _) = fields
+        self.balls = balls
+        self.bullets = bullets
+        self.power_ups = power_ups
+        self.seq = seq
+        self.indices = indices
+        self.hits = hits
+
+
+def decode_frame(body):
+    """Unpack a FRAME body, brick delta included, into a Frame.
+
+    balls is an (n, 2) array of extra ball positions, bullets a list of
+    top left corners, power_ups a list of (x, y, power type), and indices
+    and hits the changed bricks.
+    """
+    fields = FRAME.unpack_from(body)
+    n_balls, n_bullets, n_power_ups = fields[-3:]
+    pos = FRAME.size
+    balls = np.frombuffer(body, dtype='<i2', count=n_balls * 2, offset=pos).reshape(-1, 2)
+    pos += n_balls * 4
+    coords = struct.unpack_from(f'<{n_bullets * 2}h', body, pos)
+    bullets = list(zip(coords[::2], coords[1::2]))
+    pos += n_bullets * 4
+    power_ups = []
+    for _ in range(n_power_ups):
+        x, y, kind = struct.unpack_from('<hhB', body, pos)
+        pos += 5
+        power_ups.append((x, y, POWER_TYPES[kind]))
+    seq, n = DELTA.unpack_from(body, pos)
+    pos += DELTA.size
+    indices = np.frombuffer(body, dtype='<u4', count=n, offset=pos).astype(np.intp)
+    hits = np.frombuffer(body, dtype=np.uint8, count=n, offset=pos + n * 4)
+    return Frame(fields, balls, bullets, power_ups, seq, indices, hits)
+
+
+class _Spectator:
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.greeted = False
+        self.layout = None
+        self.acked = 0
+        self.dropped = 0
+
+
+class NullStreamServer:
+    """Stands in for StreamServer when streaming is off."""
+
+    enabled = False
+
+    def publish(self, state):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_STREAM = NullStreamServer()
+
+
+class StreamServer:
+    """Publishes the ticks of a game to spectators from a background thread.
+
+    publish() is all the game loop calls. It packs the moving parts of the
+    state, copies the brick hit counts and hands them to an asyncio loop in
+    another thread, so a frame never waits on the network. Only the latest
+    tick is kept: if the loop falls behind it sends that one, and spectators
+    whose socket buffer is still full from earlier ticks are skipped until
+    it drains, so a slow viewer misses ticks instead of slowing the game.
+
+    Bricks are sent whole once per level and game. After that each FRAME
+    carries the bricks changed since the last brick state the spectator
+    acknowledged, so a delta that never arrived is simply part of the next.
+    """
+
+    enabled = True
+
+    def __init__(self, address):
+        self.address = address
+        self._kind, self._where = parse_address(address)
+        self._latest = None
+        self._wakeup = False
+        self._sent = None
+        self._spectators = set()
+        # Brick state as spectators know it: hit counts and the seq each brick last changed at
+        self._layout = None
+        self._store = None
+        self._hits = None
+        self._changed_at = None
+        self._seq = 0
+        self._layout_cache = None
+        self._encode_failed = False
+        # Only touched by publish(), on the game's thread
+        self._published = None
+        self._layout_id = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='stream', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        kind, where = self._kind, self._where
+        try:
+            if kind == 'unix':
+                # A socket left behind by an earlier game
+                if os.path.exists(where) and stat.S_ISSOCK(os.stat(where).st_mode):
+                    os.unlink(where)
+                server = self._loop.run_until_complete(asyncio.start_unix_server(self._serve, where))
+            else:
+                server = self._loop.run_until_complete(asyncio.start_server(self._serve, *where))
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            for spectator in self._spectators:
+                spectator.writer.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+            if kind == 'unix' and os.path.exists(where):
+                os.unlink(where)
+
+    def publish(self, state):
+        """Queue the current tick of state for the spectators. Never blocks or raises."""
+        bricks = state.bricks
+        # layout_version starts over with every GameState, so a new game can
+        # repeat a number spectators already have. A new store always gets a new id.
+        if bricks is not self._published:
+            self._published = bricks
+            self._layout_id += 1
+        try:
+            frame = encode_frame(state, self._layout_id)
+        except (struct.error, KeyError, ValueError, OverflowError) as e:
+            # Spectators miss this tick, the game goes on
+            if not self._encode_failed:
+                self._encode_failed = True
+                print(f"Warning: could not stream a tick: {e}")
+            return
+        self._latest = ((state.width, state.height), self._layout_id, bricks, bricks.hits.copy(), frame)
+        if not self._wakeup:
+            self._wakeup = True
+            self._loop.call_soon_threadsafe(self._flush)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=1)
+
+    async def _serve(self, reader, writer):
+        spectator = _Spectator(writer)
+        self._spectators.add(spectator)
+        # Show the last tick straight away, the game may be paused
+        if self._sent is not None:
+            self._send(spectator, self._sent[0], self._sent[4])
+        try:
+            while True:
+                length, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                body = await reader.readexactly(length)
+                if body[0] == MSG_ACK and len(body) == ACK.size:
+                    _, layout, seq = ACK.unpack(body)
+                    # Acks for an earlier level say nothing about this one
+                    if layout == spectator.layout:
+                        spectator.acked = max(spectator.acked, seq)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # Gone, or the server is closing
+        finally:
+            self._spectators.discard(spectator)
+            writer.close()
+
+    def _track_bricks(self, layout, store, hits):
+        if layout != self._layout:
+            self._layout = layout
+            self._store = store
+            self._hits = hits
+            self._changed_at = np.zeros(len(hits), dtype=np.uint32)
+            return
+        changed = np.flatnonzero(hits != self._hits)
+        if len(changed):
+            self._seq += 1
+            self._hits = hits
+            self._changed_at[changed] = self._seq
+
+    def _layout_message(self):
+        # Shared by every spectator that needs it until the bricks change again
+        key = (self._layout, self._seq)
+        if self._layout_cache is None or self._layout_cache[0] != key:
+            store = self._store
+            arrays = (store.rects.astype('<i2'), store.types, store.hits_required, store.colors, self._hits)
+            data = zlib.compress(b''.join(a.tobytes() for a in arrays))
+            body = LAYOUT.pack(MSG_LAYOUT, self._layout, self._seq, len(store.rects)) + data
+            self._layout_cache = (key, _message(body))
+        return self._layout_cache[1]
+
+    def _send(self, spectator, size, frame):
+        writer = spectator.writer
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+            spectator.dropped += 1
+            return
+        if not spectator.greeted:
+            writer.write(_message(HELLO.pack(MSG_HELLO, MAGIC, PROTOCOL_VERSION, *size)))
+            spectator.greeted = True
+        if spectator.layout != self._layout:
+            writer.write(self._layout_message())
+            # The layout carries the hit counts as of now, so it is the baseline
+            spectator.layout = self._layout
+            spectator.acked = self._seq
+        if spectator.acked < self._seq:
+            changed = np.flatnonzero(self._changed_at > spectator.acked)
+            delta = DELTA.pack(self._seq, len(changed)) + changed.astype('<u4').tobytes() + self._hits[changed].tobytes()
+        else:
+            delta = DELTA.pack(self._seq, 0)
+        writer.write(_message(frame + delta))
+
+    def _flush(self):
+        self._wakeup = False
+        latest = self._latest
+        if latest is self._sent:
+            return
+        self._sent = latest
+        size, layout, store, hits, frame = latest
+        self._track_bricks(layout, store, hits)
+        for spectator in list(self._spectators):
+            self._send(spectator, size, frame)
+
+
+_server = None
+
+
+def get_stream_server():
+    """The process wide stream server. LOFTWAHNOID_STREAM=<address> turns it on,
+    otherwise it is a NullStreamServer."""
+    global _server
+    if _server is None:
+        address = os.environ.get('LOFTWAHNOID_STREAM')
+        _server = NULL_STREAM
+        if address:
+            try:
+                _server = StreamServer(address)
+                atexit.register(_server.close)
+            except (OSError, StreamError) as e:
+                print(f"Warning: could not start the stream server: {e}")
+    return _server
+
+
+class SpectatorState:
+    """The parts of a GameState a Renderer draws, rebuilt from stream messages."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        # Sized like GameState's, only their positions come from the stream
+        self.timers = Scheduler()
+        self.ball = Ball(0, 0, 8, 5, width)
+        self.paddle = Paddle(0, height - 30, 100, 10, 7, self.timers, width)
+        self.extra_balls = BallSet(self.ball.radius, self.ball.speed, field_width=width)
+        self.bricks = BrickStore(np.zeros((0, 4)), [], [], [])
+        self.particles = None
+        self.power_ups = []
+        self.changed_bricks = []
+        self.layout_version = 0
+        self.layout = None
+        self.seq = 0
+        self.score = 0
+        self.lives = 0
+        self.level = 0
+        self.tick = 0
+
+    def apply_layout(self, body):
+        _, self.layout, self.seq, n = LAYOUT.unpack_from(body)
+        data = np.frombuffer(zlib.decompress(body[LAYOUT.size:]), dtype=np.uint8)
+        rects = data[:n * 8].view('<i2').reshape(n, 4)
+        types, hits_required, colors, hits = data[n * 8:].reshape(4, n)
+        self.bricks = BrickStore(rects, types, hits_required, colors)
+        self.bricks.set_hits(np.arange(n), hits)
+        self.layout_version += 1
+        self.changed_bricks.clear()
+
+    def apply_frame(self, body):
+        frame = decode_frame(body)
+        self.tick, self.score, self.lives, self.level = frame.tick, frame.score, frame.lives, frame.level
+        ball = self.ball
+        ball.x = ball.prev_x = frame.ball_x
+        ball.y = ball.prev_y = frame.ball_y
+
+        paddle = self.paddle
+        paddle.rect.update(frame.paddle_x, frame.paddle_y, frame.paddle_width, paddle.rect.height)
+        paddle.prev_x = frame.paddle_x
+        paddle.sticky = bool(frame.flags & STICKY)
+        paddle.shooting = bool(frame.flags & SHOOTING)
+        paddle.flashing = bool(frame.flags & FLASHING)
+        self.timers.clear()
+        for key, left in (('sticky', frame.sticky), ('shooting', frame.shooting), ('flash', frame.flash)):
+            if left:
+                self.timers.start(key, self.tick, left)
+
+        self.extra_balls.clear()
+        if len(frame.balls):
+            self.extra_balls.add(frame.balls[:, 0], frame.balls[:, 1], 0, 0)
+
+        bullet_pool.release_all(paddle.bullets)
+        # Bullets are made from the point they are fired from, above their top left
+        paddle.bullets[:] = [bullet_pool.get(x + 2, y + 8) for x, y in frame.bullets]
+
+        self.power_ups = [PowerUp(x, y, kind) for x, y, kind in frame.power_ups]
+
+        if frame.layout == self.layout:
+            if len(frame.indices):
+                self.bricks.set_hits(frame.indices, frame.hits)
+                self.changed_bricks.extend(frame.indices.tolist())
+            self.seq = max(self.seq, frame.seq)
+
+
+class SpectatorClient:
+    """Reads a stream from a non-blocking socket into a SpectatorState."""
+
+    def __init__(self, address, timeout=5.0):
+        kind, where = parse_address(address)
+        family = socket.AF_UNIX if kind == 'unix' else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(where)
+        self._buffer = bytearray()
+        self.state = None
+        self.closed = False
+        self._acked = None
+        # The HELLO sizes the window, so wait for it before going non-blocking
+        while self.state is None:
+            self._receive(block=True)
+        self.sock.setblocking(False)
+
+    def _receive(self, block=False):
+        # Returns True if anything was read
+        try:
+            data = self.sock.recv(1 << 16)
+        except BlockingIOError:
+            return False
+        except socket.timeout:
+            raise StreamError("The stream sent nothing") from None
+        if not data:
+            self.closed = True
+            if block:
+                raise StreamError("Stream closed before it started")
+            return False
+        self._buffer += data
+        self._parse()
+        return True
+
+    def _parse(self):
+        buf = self._buffer
+        pos = 0
+        acked = None
+        while len(buf) - pos >= LENGTH.size:
+            length, = LENGTH.unpack_from(buf, pos)
+            if len(buf) - pos - LENGTH.size < length:
+                break
+            body = bytes(buf[pos + LENGTH.size:pos + LENGTH.size + length])
+            pos += LENGTH.size + length
+            kind = body[0]
+            if kind == MSG_HELLO:
+                _, magic, version, width, height = HELLO.unpack(body)
+                if magic != MAGIC or version != PROTOCOL_VERSION:
+                    raise StreamError("Not a loftwahnoid stream, or a different version")
+                self.state = SpectatorState(width, height)
+            elif kind == MSG_LAYOUT:
+                self.state.apply_layout(body)
+                acked = self.state.seq
+            elif kind == MSG_FRAME:
+                self.state.apply_frame(body)
+                acked = self.state.seq
+        del buf[:pos]
+        # Only brick changes need acking
+        if acked is not None and (self.state.layout, acked) != self._acked:
+            self._acked = (self.state.layout, acked)
+            self._send(_message(ACK.pack(MSG_ACK, *self._acked)))
+
+    def _send(self, data):
+        try:
+            self.sock.sendall(data)
+        except (BlockingIOError, OSError):
+            pass  # Acks are only an optimisation, the next one covers this one
+
+    def poll(self):
+        """Apply everything that has arrived. Returns False once the stream has ended."""
+        while self._receive():
+            pass
+        return not self.closed
+
+    def close(self):
+        self.sock.close()
+
+
+def watch(address):
+    """Show a stream in a window until it ends or the window is closed."""
+    import pygame
+    from .render import Renderer
+
+    client = SpectatorClient(address)
+    state = client.state
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((state.width, state.height))
+    pygame.display.set_caption("Loftwahnoid Supreme - Spectator")
+    renderer = Renderer(screen)
+    clock = pygame.time.Clock()
+    try:
+        while client.poll():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    return
+            renderer.draw(state)
+            renderer.present()
+            clock.tick(TICK_RATE)
+    finally:
+        client.close()
+        pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loftwahnoid.stream', description="Watch a streamed game")
+    parser.add_argument('command', choices=['watch'])
+    parser.add_argument('address', help="host:port, port or unix:<path>")
+    args = parser.parse_args(argv)
+    try:
+        watch(args.address)
+    except (OSError, StreamError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import heapq
+import itertools
+
+
+class Scheduler:
+    """Named timers counted in simulation ticks, kept in a heap by expiry.
+
+    start() and cancel() cost O(log n) and run() only looks at timers that
+    are due, so nothing is polled while effects are running. A timer started
+    at tick t for d ticks is active through tick t + d and fires its callback
+    on the first run() after that, the same moment a "now - t > d" check
+    would have seen it expire. Timers only move when run() is called with a
+    later tick, so they stop while the simulation is paused.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._timers = {}
+        self._order = itertools.count()
+
+    def start(self, key, now, duration, on_expire=None):
+        """Start timer key, replacing it if it is already running."""
+        self._timers.pop(key, None)
+        entry = (now + duration + 1, next(self._order), key, on_expire)
+        self._timers[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def cancel(self, key):
+        """Stop timer key without calling its callback."""
+        # Left in the heap and skipped when it comes up
+        self._timers.pop(key, None)
+
+    def active(self, key):
+        return key in self._timers
+
+    def remaining(self, key, now):
+        """Ticks left on timer key, 0 if it is not running."""
+        entry = self._timers.get(key)
+        if entry is None:
+            return 0
+        return max(0, entry[0] - 1 - now)
+
+    def run(self, now):
+        """Fire the callbacks of every timer due by tick now, earliest first."""
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            key = entry[2]
+            if self._timers.get(key) is not entry:
+                continue  # Cancelled or restarted
+            del self._timers[key]
+            if entry[3] is not None:
+                entry[3]()
+
+    def clear(self):
+        self._heap.clear()
+        self._timers.clear()
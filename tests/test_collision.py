@@ -0,0 +1,49 @@
+import math
+import pygame
+import pytest
+from loftwahnoid.collision import sweep_circle_rect, sweep_circle_walls, reflect
+
+
+def test_fast_ball_hits_brick_it_would_tunnel_through():
+    # 60 px in one tick, the 20 px brick is entirely between the two positions
+    brick = pygame.Rect(100, 100, 60, 20)
+    hit = sweep_circle_rect(130, 170, 0, -60, 8, brick)
+    assert hit is not None
+    t, nx, ny = hit
+    # The ball's top touches the brick's bottom edge at y=128
+    assert t == pytest.approx((170 - 128) / 60)
+    assert (nx, ny) == (0, 1)
+
+
+def test_side_hit_has_horizontal_normal():
+    brick = pygame.Rect(100, 100, 60, 20)
+    t, nx, ny = sweep_circle_rect(50, 110, 100, 0, 8, brick)
+    assert t == pytest.approx((100 - 8 - 50) / 100)
+    assert (nx, ny) == (-1, 0)
+
+
+def test_corner_hit_normal_points_from_corner():
+    brick = pygame.Rect(100, 100, 60, 20)
+    # Diagonally at the bottom right corner
+    t, nx, ny = sweep_circle_rect(200, 160, -50, -50, 8, brick)
+    x, y = 200 - 50 * t, 160 - 50 * t
+    assert math.hypot(x - 160, y - 120) == pytest.approx(8)
+    assert nx == pytest.approx(ny)
+    assert math.hypot(nx, ny) == pytest.approx(1)
+
+
+def test_miss_and_moving_away():
+    brick = pygame.Rect(100, 100, 60, 20)
+    assert sweep_circle_rect(300, 300, 0, -50, 8, brick) is None
+    # Short of the brick this tick
+    assert sweep_circle_rect(130, 170, 0, -10, 8, brick) is None
+    # Overlapping already but leaving
+    assert sweep_circle_rect(130, 125, 0, 10, 8, brick) is None
+
+
+def test_walls_and_reflect():
+    t, nx, ny = sweep_circle_walls(10, 300, -20, 0, 8, 800)
+    assert t == pytest.approx(0.1)
+    assert (nx, ny) == (1, 0)
+    assert reflect(-3, 4, nx, ny) == (3, 4)
+    assert sweep_circle_walls(400, 300, 5, 5, 8, 800) is None
@@ -0,0 +1,122 @@
+import json
+import pytest
+from loftwahnoid.highscores import (JSONScoreStore, SQLiteScoreStore, HighScoreManager, open_store,
+                                    import_legacy_scores)
+
+
+@pytest.fixture(params=['scores.json', 'scores.db'])
+def store_path(request, tmp_path):
+    return str(tmp_path / request.param)
+
+
+def entry(name, score, level=1, t=0):
+    return {"name": name, "score": score, "level": level, "time": t}
+
+
+def test_open_store_picks_by_extension(store_path):
+    store = open_store(store_path)
+    assert isinstance(store, SQLiteScoreStore if store_path.endswith('.db') else JSONScoreStore)
+    store.close()
+
+
+def test_top_and_rank_after_write(store_path):
+    store = open_store(store_path)
+    store.add([entry('a', 100), entry('b', 300, 3, 1), entry('c', 200, 2, 2)])
+    store.add([entry('a', 250, 2, 3)])
+    assert [e['score'] for e in store.top(3)] == [300, 250, 200]
+    assert store.top(1)[0] == entry('b', 300, 3, 1)
+    assert store.rank(1000) == 1
+    assert store.rank(250) == 2
+    assert store.rank(260) == 2
+    assert store.rank(0) == 5
+    assert [e['score'] for e in store.history('a')] == [100, 250]
+    store.close()
+
+    # Still there after reopening
+    store = open_store(store_path)
+    assert [e['score'] for e in store.top(10)] == [300, 250, 200, 100]
+    store.close()
+
+
+def test_equal_scores_keep_insertion_order(store_path):
+    store = open_store(store_path)
+    store.add([entry('first', 50), entry('second', 50)])
+    assert [e['name'] for e in store.top(2)] == ['first', 'second']
+    store.close()
+
+
+def test_manager_writes_in_background(store_path):
+    manager = HighScoreManager(path=store_path)
+    manager.add_score('a', 10, 1)
+    manager.add_score('b', 30, 2)
+    assert [e['name'] for e in manager.get_high_scores()] == ['b', 'a']
+    assert manager.rank(20) == 2
+    manager.close()
+    assert [e['name'] for e in open_store(store_path).top(5)] == ['b', 'a']
+
+
+def test_manager_without_store_answers_empty(tmp_path):
+    # A directory where the file should be, so the store cannot open
+    path = tmp_path / 'scores.db'
+    path.mkdir()
+    manager = HighScoreManager(path=str(path))
+    assert manager.top(5) == []
+    assert manager.rank(100) == 1
+    assert manager.history('a') == []
+    manager.close()
+
+
+def test_legacy_scores_imported_once(store_path, tmp_path):
+    legacy = tmp_path / 'old.json'
+    legacy.write_text(json.dumps([{"name": "old", "score": 70, "level": 3}, "junk"]))
+    store = open_store(store_path)
+    assert import_legacy_scores(store, str(legacy)) == 1
+    assert import_legacy_scores(store, str(legacy)) == 0
+    assert [(e['name'], e['score']) for e in store.top(5)] == [('old', 70)]
+    store.close()
+
+
+@pytest.mark.parametrize('content, kept', [
+    ('{"name": "x"}', []),
+    ('[1', []),
+    ('[{"name": "a", "score": 5, "level": 1}, {"name": "b"}, {"name": "c", "score": true, "level": 1}]', ['a']),
+])
+def test_damaged_json_file_is_backed_up(tmp_path, content, kept):
+    path = tmp_path / 'scores.json'
+    path.write_text(content)
+    store = JSONScoreStore(str(path))
+    assert [e['name'] for e in store.top(5)] == kept
+    assert store.rank(1) == len(kept) + 1
+    assert (tmp_path / 'scores.json.bad').read_text() == content
+    assert JSONScoreStore(str(path)).top(5) == store.top(5)
+
+
+class BrokenStore:
+    """Fails every read, like a store over a file it cannot make sense of."""
+
+    def __init__(self):
+        self.added = []
+
+    def top(self, n):
+        raise ValueError("unreadable")
+
+    def rank(self, score):
+        return 1
+
+    def add(self, entries):
+        self.added.extend(entries)
+
+    def close(self):
+        pass
+
+
+def test_manager_keeps_writing_after_a_failed_load():
+    store = BrokenStore()
+    manager = HighScoreManager(store=store)
+    manager.add_score('a', 10, 1)
+    assert manager.rank(5) == 1
+    assert [e['name'] for e in store.added] == ['a']
+    manager.close()
+    # Nothing left to write them, flush must not wait
+    manager.add_score('b', 20, 1)
+    manager.flush()
@@ -0,0 +1,100 @@
+import json
+import os
+import random
+import pytest
+from loftwahnoid.bricks import NORMAL, TOUGH
+from loftwahnoid.levels import LevelError, LevelPack, parse_pack, _cache_path
+
+CLASSIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'loftwahnoid', 'packs', 'classic.json')
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    # Keep level caches out of the real data directory
+    monkeypatch.setenv('LOFTWAHNOID_DATA_DIR', str(tmp_path / 'data'))
+
+
+def pack(*levels, **extra):
+    return {'levels': list(levels), **extra}
+
+
+def test_compiles_bricks():
+    (level,) = parse_pack(pack({'rows': ['N.T', 'R29']}))
+    assert len(level) == 5
+    rect, kind, hits, color = level[0]
+    assert rect == (5, 50, 260, 20)
+    assert (kind, hits, color) == (NORMAL, 1, -1)
+    assert level[1][1:] == (TOUGH, 2, -1)
+    # R is red, 9 a tough brick taking nine hits
+    assert level[2][3] == 0
+    assert level[4][1:] == (TOUGH, 9, -1)
+
+
+@pytest.mark.parametrize('data, message', [
+    ([], "non-empty 'levels'"),
+    (pack(), "non-empty 'levels'"),
+    (pack({'rows': []}), "'rows' must be"),
+    (pack({'rows': ['NN', 'N']}), 'same, non-zero length'),
+    (pack({'rows': ['NZ']}), "unknown brick 'Z'"),
+    (pack({'rows': ['...']}), 'no bricks'),
+    (pack({'rows': ['N' * 200]}), 'do not fit'),
+    (pack({'rows': ['N'] * 40}), 'too far down'),
+    (pack({'rows': ['N'], 'spacing': -1}), 'spacing must be'),
+    (pack({'rows': ['N'], 'spacing': True}), 'spacing must be'),
+    (pack({'rows': ['N'], 'top': 1.5}), 'top must be'),
+    (pack({'rows': ['X']}, legend={'X': {'type': 'tough', 'hits': True}}), 'has hits True'),
+    (pack({'rows': ['X']}, legend={'X': {'type': 'tough', 'hits': 256}}), 'has hits 256'),
+    (pack({'rows': ['X']}, legend={'X': {'type': 'round'}}), "needs a type"),
+    (pack({'rows': ['X']}, legend={'X': {'type': 'normal', 'color': 'pink'}}), "unknown color 'pink'"),
+    (pack({'rows': ['X']}, legend={'X': {'type': 'tough', 'color': 'red'}}), 'fixed colors'),
+    (pack({'rows': ['N']}, legend={'XY': {'type': 'normal'}}), 'single non-blank'),
+])
+def test_validation_errors(data, message):
+    with pytest.raises(LevelError, match=message):
+        parse_pack(data)
+
+
+def test_error_names_level():
+    with pytest.raises(LevelError, match='pack level 2'):
+        parse_pack(pack({'rows': ['N']}, {'rows': ['Q']}))
+
+
+def test_load_rejects_bad_files(tmp_path):
+    bad_json = tmp_path / 'bad.json'
+    bad_json.write_text('{"levels": [')
+    with pytest.raises(LevelError):
+        LevelPack.load(str(bad_json))
+    not_utf8 = tmp_path / 'latin.json'
+    not_utf8.write_bytes(b'\xff\xfe{}')
+    with pytest.raises(LevelError):
+        LevelPack.load(str(not_utf8))
+
+
+def test_cache_round_trip(tmp_path):
+    path = tmp_path / 'pack.json'
+    path.write_text(json.dumps(pack({'rows': ['NTN']}, {'rows': ['4.G', 'BBB']})))
+    first = LevelPack.load(str(path))
+    assert os.path.exists(_cache_path(str(path), (800, 600)))
+    cached = LevelPack.load(str(path))
+    assert len(cached) == 2
+    for name in ('offsets', 'rects', 'types', 'hits', 'colors'):
+        assert (getattr(cached, name) == getattr(first, name)).all()
+
+    bricks = cached.bricks(2, random.Random(1))
+    assert len(bricks) == 5
+    assert bricks.hits_required.tolist() == [4, 1, 1, 1, 1]
+    # Levels wrap around after the last one
+    assert len(cached.bricks(3, random.Random(1))) == 3
+
+
+def test_stale_cache_is_rebuilt(tmp_path):
+    path = tmp_path / 'pack.json'
+    path.write_text(json.dumps(pack({'rows': ['NN']})))
+    assert len(LevelPack.load(str(path)).types) == 2
+    path.write_text(json.dumps(pack({'rows': ['NNNN']})))
+    os.utime(path, ns=(0, 0))
+    assert len(LevelPack.load(str(path)).types) == 4
+
+
+def test_classic_pack_loads():
+    assert len(LevelPack.load(CLASSIC)) == 5
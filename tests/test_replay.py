@@ -0,0 +1,70 @@
+import pytest
+from loftwahnoid.autopilot import Autopilot
+from loftwahnoid.replay import Replay, ReplayError, ReplayRecorder, verify, simulate
+from loftwahnoid.simulation import GameState, step
+
+
+def record(ticks, **kwargs):
+    state = GameState(seed=7, effects=False, **kwargs)
+    recorder = ReplayRecorder(state.seed, state.swept_collision, state.mega, (state.width, state.height))
+    pilot = Autopilot()
+    for i in range(ticks):
+        if state.game_over:
+            break
+        inputs = pilot.inputs(state)
+        recorder.record(inputs, paused=i == 100)
+        step(state, inputs)
+    return state, recorder.finish(state)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'swept_collision': True}, {'mega': True},
+                                    {'mega': True, 'size': (1280, 720)}])
+def test_record_verify_round_trip(tmp_path, kwargs):
+    state, replay = record(3000, **kwargs)
+    assert state.score > 0
+    path = tmp_path / 'game.lwr'
+    replay.save(path)
+    loaded = Replay.load(path)
+    assert (loaded.seed, loaded.ticks, loaded.score, loaded.level) == (7, state.tick, state.score, state.level)
+    assert (loaded.swept_collision, loaded.mega) == (state.swept_collision, state.mega)
+    assert loaded.size == (state.width, state.height)
+    assert loaded.runs == replay.runs
+    assert verify(loaded)
+    assert simulate(loaded).score == state.score
+
+
+def test_tampered_score_fails_verify():
+    _, replay = record(1500)
+    replay.score += 10
+    assert not verify(Replay.from_bytes(replay.to_bytes()))
+
+
+def test_long_runs_use_varints():
+    replay = Replay(1, runs=[(0, 1), (1, 300), (2, 70000)], ticks=70301)
+    assert Replay.from_bytes(replay.to_bytes()).runs == replay.runs
+
+
+@pytest.mark.parametrize('data', [b'', b'XXXX' + bytes(16)])
+def test_not_a_replay(data):
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(data)
+
+
+def test_truncated_run():
+    data = Replay(1, runs=[(1, 300)], ticks=300).to_bytes()
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(data[:-1])
+
+
+def test_runs_must_match_ticks():
+    # Claims 10 ticks but idles for 2**40, playing it would never finish
+    data = Replay(1, runs=[(0, 2 ** 40)], ticks=10).to_bytes()
+    with pytest.raises(ReplayError, match='cover'):
+        Replay.from_bytes(data)
+    with pytest.raises(ReplayError, match='cover'):
+        Replay.from_bytes(Replay(1, runs=[(0, 5)], ticks=10).to_bytes())
+
+
+def test_playback_stops_at_ticks():
+    replay = Replay(1, runs=[(0, 2 ** 40)], ticks=10)
+    assert simulate(replay).tick == 10
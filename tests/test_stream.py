@@ -0,0 +1,147 @@
+import time
+import pytest
+from loftwahnoid.autopilot import Autopilot
+from loftwahnoid.simulation import GameState, step
+from loftwahnoid.sprites.paddle import bullet_pool
+from loftwahnoid.sprites.powerup import PowerUp
+from loftwahnoid.stream import (DELTA, POWER_TYPES, SpectatorClient, SpectatorState, StreamError, StreamServer,
+                                decode_frame, encode_frame, parse_address)
+
+
+def played(ticks, **kwargs):
+    state = GameState(seed=3, effects=False, **kwargs)
+    pilot = Autopilot()
+    for _ in range(ticks):
+        step(state, pilot.inputs(state))
+    return state
+
+
+def round_trip(state):
+    frame = decode_frame(encode_frame(state) + DELTA.pack(0, 0))
+    assert (frame.tick, frame.score, frame.lives, frame.level) == (state.tick, state.score, state.lives,
+                                                                   state.level)
+    assert frame.layout == state.layout_version
+    assert (frame.ball_x, frame.ball_y) == pytest.approx((state.ball.x, state.ball.y))
+    assert (frame.paddle_x, frame.paddle_y, frame.paddle_width) == tuple(state.paddle.rect)[:3]
+    n = state.extra_balls.count
+    assert frame.balls.tolist() == [[int(x), int(y)] for x, y in zip(state.extra_balls.x[:n],
+                                                                      state.extra_balls.y[:n])]
+    assert frame.bullets == [bullet.rect.topleft for bullet in state.paddle.bullets]
+    assert frame.power_ups == [(int(p.x), int(p.y), p.power_type) for p in state.power_ups]
+    return frame
+
+
+def test_frame_round_trip_mid_game():
+    round_trip(played(2000))
+
+
+def test_frame_round_trip_with_hundreds_of_entities():
+    # Mega boards put hundreds of power-ups and extra balls on screen at once
+    state = GameState(seed=3, effects=False, mega=True, size=(1920, 1080))
+    state.power_ups = [PowerUp(10 + i * 4 % 1900, 100 + i, POWER_TYPES[i % len(POWER_TYPES)]) for i in range(450)]
+    state.extra_balls.add([float(i) for i in range(300)], [500.0] * 300, 1.0, -1.0)
+    state.paddle.bullets.extend(bullet_pool.get(100 + i * 10, 400) for i in range(3))
+    frame = round_trip(state)
+    assert len(frame.power_ups) == 450
+    assert len(frame.balls) == 300
+
+
+def test_spectator_state_applies_delta():
+    state = played(1)
+    spectator = SpectatorState(state.width, state.height)
+    body = encode_frame(state) + DELTA.pack(4, 2) + bytes([1, 0, 0, 0, 7, 0, 0, 0]) + bytes([1, 1])
+    frame = decode_frame(body)
+    assert (frame.seq, frame.indices.tolist(), frame.hits.tolist()) == (4, [1, 7], [1, 1])
+    spectator.apply_frame(body)
+    assert spectator.score == state.score
+    assert (spectator.paddle.rect.x, spectator.ball.x) == (state.paddle.rect.x, state.ball.x)
+
+
+def test_publish_skips_ticks_it_cannot_encode(tmp_path):
+    server = StreamServer(f'unix:{tmp_path}/stream.sock')
+    try:
+        state = played(1)
+        state.power_ups = [PowerUp(10, 10, 'not a power-up')]
+        server.publish(state)
+    finally:
+        server.close()
+
+
+def play_watched(server, clients, state, pilot, ticks):
+    for _ in range(ticks):
+        step(state, pilot.inputs(state))
+        server.publish(state)
+        if state.tick % 100 == 0:
+            time.sleep(0.01)
+            for client in clients:
+                client.poll()
+    deadline = time.time() + 5
+    while any(client.state.tick != state.tick for client in clients) and time.time() < deadline:
+        time.sleep(0.01)
+        for client in clients:
+            client.poll()
+
+
+def assert_watching(client, state):
+    watched = client.state
+    assert watched.tick == state.tick
+    assert watched.score == state.score
+    for name in ('rects', 'types', 'colors', 'hits_required', 'hits', 'alive'):
+        assert (getattr(watched.bricks, name) == getattr(state.bricks, name)).all(), name
+    assert len(watched.bricks) == len(state.bricks)
+
+
+def start_game(server, seed):
+    state = GameState(seed=seed, effects=False)
+    pilot = Autopilot()
+    step(state, pilot.inputs(state))
+    server.publish(state)
+    return state, pilot
+
+
+def test_live_stream_matches_game(tmp_path):
+    address = f'unix:{tmp_path}/stream.sock'
+    server = StreamServer(address)
+    state, pilot = start_game(server, 3)
+    client = SpectatorClient(address)
+    try:
+        play_watched(server, [client], state, pilot, 1500)
+        assert_watching(client, state)
+    finally:
+        client.close()
+        server.close()
+
+
+def test_next_game_on_the_same_server_sends_its_own_bricks(tmp_path):
+    # Both games start at layout_version 1, the spectator must still get game 2's bricks
+    address = f'unix:{tmp_path}/stream.sock'
+    server = StreamServer(address)
+    first, pilot = start_game(server, 1)
+    client = SpectatorClient(address)
+    late = None
+    try:
+        play_watched(server, [client], first, pilot, 300)
+        assert_watching(client, first)
+
+        second, pilot = start_game(server, 2)
+        assert second.layout_version == first.layout_version
+        play_watched(server, [client], second, pilot, 300)
+        assert_watching(client, second)
+
+        late = SpectatorClient(address)
+        play_watched(server, [client, late], second, pilot, 300)
+        assert_watching(client, second)
+        assert_watching(late, second)
+    finally:
+        client.close()
+        if late is not None:
+            late.close()
+        server.close()
+
+
+def test_parse_address():
+    assert parse_address('unix:/tmp/x') == ('unix', '/tmp/x')
+    assert parse_address('9000') == ('tcp', ('127.0.0.1', 9000))
+    assert parse_address('0.0.0.0:9000') == ('tcp', ('0.0.0.0', 9000))
+    with pytest.raises(StreamError):
+        parse_address('host:port')